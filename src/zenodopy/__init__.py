@@ -1,7 +1,28 @@
 """
 Set up module access for the base package
 """
+from .zenodopy import BandwidthLimiter
 from .zenodopy import Client
 from .zenodopy import ZenodoMetadata
+from .zenodopy import FileCache
+from .zenodopy import make_session
+from .zenodopy import ProgressReporter
+from .zenodopy import RateLimiter
+from .zenodopy import RecordCache
+from .zenodopy import RequestEvent
+from .zenodopy import RequestStats
+from .zenodopy import RetryPolicy
+from .zenodopy import SpanHook
+from .zenodopy import TransferStatus
 
-__all__ = ['Client','ZenodoMetadata']
+__all__ = ['AsyncClient', 'BandwidthLimiter', 'Client', 'ZenodoMetadata', 'FileCache', 'make_session',
+           'ProgressReporter', 'RateLimiter', 'RecordCache', 'RequestEvent', 'RequestStats', 'RetryPolicy',
+           'SpanHook', 'TransferStatus']
+
+
+def __getattr__(name):
+    # AsyncClient needs asyncio, which is only imported when it is asked for
+    if name == 'AsyncClient':
+        from .asyncclient import AsyncClient
+        return AsyncClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,417 @@
+"""
+asyncio counterpart of zenodopy.Client, built on aiohttp
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+from .zenodopy import (
+    DOWNLOAD_CHUNK_SIZE,
+    Client,
+    RateLimiter,
+    RetryPolicy,
+    ZenodoMetadata,
+    _UNREAD,
+    parse_checksum,
+    validate_url,
+)
+
+
+def _write_chunk(f, chunk, hasher):
+    """write chunk to f and add it to hasher, if any"""
+    f.write(chunk)
+    if hasher is not None:
+        hasher.update(chunk)
+
+
+class AsyncClient(object):
+    """Asynchronous Zenodo Client object
+
+    Mirrors Client for asyncio applications. Requests share one pooled
+    aiohttp session, so many calls can run concurrently on one event
+    loop without tying up threads. Requires aiohttp (pip install aiohttp).
+
+        ```
+        import zenodopy
+        async with zenodopy.AsyncClient() as zeno:
+            await zeno.set_project(dep_id)
+            await zeno.upload_file("~/data.nc")
+        ```
+    """
+
+    _read_config = staticmethod(Client._read_config)
+    # the property objects themselves, so that they bind to AsyncClient instances
+    _read_from_config = Client.__dict__['_read_from_config']
+    _token = Client.__dict__['_token']
+    _check_parent_doi = staticmethod(Client._check_parent_doi)
+    _summarize_deposition = staticmethod(Client._summarize_deposition)
+
+    def __init__(self, title=None, bucket=None, deposition_id=None, sandbox=None, token=None,
+                 session=None, limit=100, limit_per_host=10, retry=None, rate_limiter=None):
+        """initialization method
+
+        Args:
+            session (aiohttp.ClientSession): session to reuse for every request (optional).
+                If not supplied a pooled session is created on the first request
+                and owned by the client.
+            limit (int): maximum number of open connections
+            limit_per_host (int): maximum number of open connections per host
+            retry (RetryPolicy): retry policy applied to every request,
+                defaults to RetryPolicy()
+            rate_limiter (RateLimiter): paces requests, defaults to RateLimiter()
+                with the Zenodo limits. Pass False to disable pacing.
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncClient requires aiohttp, install it with `pip install aiohttp`") from None
+        self._aiohttp = aiohttp
+
+        if sandbox:
+            self._endpoint = "https://sandbox.zenodo.org/api"
+        else:
+            self._endpoint = "https://zenodo.org/api"
+
+        self.title = title
+        self.bucket = bucket
+        self.deposition_id = deposition_id
+        self.sandbox = sandbox
+        self._access_token = _UNREAD if token is None else token
+
+        self._owns_session = session is None
+        self._session = session
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._retry = RetryPolicy() if retry is None else retry
+        self._rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+
+    def __repr__(self):
+        return f"zenodoapi('{self.title}','{self.bucket}','{self.deposition_id}')"
+
+    def __str__(self):
+        return f"{self.title} --- {self.deposition_id}"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """close the pooled connections held by the client
+
+        A session supplied by the caller is left open.
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ---------------------------------------------
+    # hidden functions
+    # ---------------------------------------------
+
+    def _get_session(self):
+        if self._session is None:
+            connector = self._aiohttp.TCPConnector(limit=self._limit, limit_per_host=self._limit_per_host)
+            self._session = self._aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _request(self, method, url, auth=True, **kwargs):
+        """send a request through the client's pooled session
+
+        Same pacing and retries as Client._request. The caller must read
+        or release the returned response.
+
+        Args:
+            method (str): HTTP method
+            url (str): URL to request
+            auth (bool): send the access token
+            **kwargs: passed on to aiohttp.ClientSession.request
+
+        Returns:
+            aiohttp.ClientResponse: the last response
+        """
+        if auth:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, Authorization=f"Bearer {self._token}")
+        data: Any = kwargs.get('data')
+        rewind = data.tell() if hasattr(data, 'seek') and hasattr(data, 'tell') else None
+        replayable = data is None or rewind is not None or isinstance(data, (bytes, str, dict))
+
+        session = self._get_session()
+        attempt = 0
+        while True:
+            if rewind is not None:
+                data.seek(rewind)
+            if self._rate_limiter:
+                await asyncio.sleep(self._rate_limiter.reserve())
+            try:
+                r = await session.request(method, url, **kwargs)
+            except (self._aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                sent = not isinstance(e, self._aiohttp.ClientConnectorError)
+                if not replayable or not self._retry.should_retry(attempt, method=method, sent=sent):
+                    raise
+                await asyncio.sleep(self._retry.delay(attempt))
+            else:
+                if self._rate_limiter:
+                    self._rate_limiter.update(r.headers)
+                if r.status < 400 or not replayable or not self._retry.should_retry(attempt, r.status, method):
+                    return r
+                r.release()
+                await asyncio.sleep(self._retry.delay(attempt, r.headers))
+            attempt += 1
+
+    async def _json(self, method, url, **kwargs):
+        """send a request and return its JSON body, raises on error statuses"""
+        r = await self._request(method, url, **kwargs)
+        async with r:
+            r.raise_for_status()
+            return await r.json(content_type=None)
+
+    async def _get_depositions(self, page=None, size=None, query=None, status=None):
+        """gets the current project deposition, see Client._get_depositions"""
+        params = {}
+        if page is not None:
+            params['page'] = page
+        if size is not None:
+            params['size'] = size
+        if query is not None:
+            params['q'] = query
+        if status is not None:
+            params['status'] = status
+        return await self._json("GET", f"{self._endpoint}/deposit/depositions", params=params)
+
+    async def _get_deposition(self, dep_id):
+        """gets a deposition by ID"""
+        return await self._json("GET", f"{self._endpoint}/deposit/depositions/{dep_id}")
+
+    async def _get_depositions_by_id(self):
+        """gets the deposition based on project id"""
+        if self.deposition_id is None:
+            print(' ** no deposition id is set on the project ** ')
+            return None
+        return await self._get_deposition(self.deposition_id)
+
+    # ---------------------------------------------
+    # user facing functions/properties
+    # ---------------------------------------------
+
+    async def _deposition_page(self, page, page_size, query, status):
+        """one page of depositions and whether another page follows, see Client.iter_depositions"""
+        params = {'page': page, 'size': page_size}
+        if query is not None:
+            params['q'] = query
+        if status is not None:
+            params['status'] = status
+        r = await self._request("GET", f"{self._endpoint}/deposit/depositions", params=params)
+        async with r:
+            r.raise_for_status()
+            items = await r.json(content_type=None)
+            return items, ('next' in r.links) if r.links else bool(items)
+
+    async def iter_depositions(self, page_size=100, query=None, status=None, prefetch=False):
+        """lazily iterate over every deposition of the account
+
+        The next page is found through the Link header, or, without one,
+        by reading pages until an empty one, see Client.iter_depositions.
+
+        Args:
+            page_size (int): number of depositions requested per page
+            query (str): search query (optional)
+            status (str): either 'draft' or 'published' (optional)
+            prefetch (bool): request the next page while the current one is consumed
+
+        Yields:
+            dict: deposition as returned by the API
+        """
+        page = 1
+        pending = None
+        try:
+            items, more = await self._deposition_page(page, page_size, query, status)
+            while isinstance(items, list) and items:
+                if prefetch and more:
+                    pending = asyncio.ensure_future(self._deposition_page(page + 1, page_size, query, status))
+                for item in items:
+                    yield item
+                if not more:
+                    return
+                page += 1
+                if pending is not None:
+                    (items, more), pending = await pending, None
+                else:
+                    items, more = await self._deposition_page(page, page_size, query, status)
+        finally:
+            # only left unfinished when the caller stops iterating early
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def projects(self, page=None, size=None):
+        """structured listing of projects, see Client.projects"""
+        depositions = await self._get_depositions(page=page, size=size)
+        if not isinstance(depositions, list):
+            return None
+        return [self._summarize_deposition(dep) for dep in depositions]
+
+    async def list_projects(self):
+        """list projects connected to the supplied ACCESS_KEY
+
+        prints to the screen the "Project Name" and "ID"
+        """
+        print('Project Name ---- ID ---- Status ---- Latest Published ID')
+        print('---------------------------------------------------------')
+        async for dep in self.iter_depositions(prefetch=True):
+            project = self._summarize_deposition(dep)
+            print(f"{project['title']} ---- {project['id']} ---- {project['status']} ---- {project['latest']}")
+
+    async def list_files(self):
+        """list files in current project
+
+        Returns:
+            list: names of the files in the project, None if no project is set
+        """
+        dep = await self._get_depositions_by_id()
+        if dep is None:
+            return None
+        return [file['filename'] for file in dep['files']]
+
+    async def create_project(self, metadata: ZenodoMetadata):
+        """Creates a new project, see Client.create_project
+
+        Args:
+            metadata (ZenodoMetadata): metadata of the new project
+        """
+        r = await self._request(
+            "POST",
+            f"{self._endpoint}/deposit/depositions",
+            data=json.dumps({}),
+            headers={"Content-Type": "application/json"},
+        )
+        async with r:
+            if r.status >= 400:
+                print("** Project not created, something went wrong. Check that your ACCESS_TOKEN is in ~/.zenodo_token ")
+                return
+            dep = await r.json(content_type=None)
+
+        self.deposition_id = dep["id"]
+        self.bucket = dep["links"]["bucket"]
+        await self.change_metadata(metadata=metadata)
+
+    async def set_project(self, dep_id=None):
+        '''set the project by id'''
+        async for project in self.iter_depositions():
+            if self._check_parent_doi(dep_id=dep_id, project_obj=project):
+                self.title = project["title"]
+                self.bucket = project.get("links", {}).get("bucket")
+                if self.bucket is None:
+                    self.bucket = (await self._get_deposition(project["id"]))['links']['bucket']
+                self.deposition_id = project["id"]
+                return
+        print(f' ** Deposition ID: {dep_id} does not exist in your projects  ** ')
+
+    async def change_metadata(self, metadata: ZenodoMetadata):
+        """Change project's metadata, see Client.change_metadata
+
+        Args:
+            metadata (ZenodoMetadata): The metadata to update.
+
+        Returns:
+            dict: the updated deposition
+        """
+        metadata.publication_date = datetime.now().strftime("%Y-%m-%d")
+        return await self._json(
+            "PUT",
+            f"{self._endpoint}/deposit/depositions/{self.deposition_id}",
+            data=json.dumps({"metadata": metadata.__dict__}),
+            headers={"Content-Type": "application/json"},
+        )
+
+    async def upload_file(self, file_path=None, publish=False):
+        """upload a file to a project
+
+        Args:
+            file_path (str): name of the file to upload
+            publish (bool): whether implemente publish action or not
+        """
+        if self.bucket is None:
+            print("You need to create a project with zeno.create_project() "
+                  "or set a project zeno.set_project() before uploading a file")
+            return
+
+        file_path = os.path.expanduser(file_path)
+        if not Path(file_path).exists():
+            raise FileNotFoundError(f"{file_path} does not exist")
+
+        with open(file_path, "rb") as fp:
+            r = await self._request("PUT", f"{self.bucket}/{os.path.basename(file_path)}", data=fp)
+        async with r:
+            print(f"{file_path} successfully uploaded!") if r.status < 400 else print("Oh no! something went wrong")
+
+        if publish:
+            return await self.publish()
+
+    async def download_file(self, filename=None, dst_path=None, chunk_size=DOWNLOAD_CHUNK_SIZE, progress=None):
+        """download a file from project
+
+        The file is streamed to ``<filename>.part`` and renamed once complete.
+        When the project is set, it is checked against the size and checksum
+        listed in the deposition's files.
+
+        Args:
+            filename (str): name of the file to download
+            dst_path (str): destination path to download the data (default is current directory)
+            chunk_size (int): number of bytes read from the network at a time
+            progress (callable): called as progress(bytes_written, total_bytes) after every chunk (optional)
+        """
+        if self.bucket is None or not validate_url(self.bucket):
+            print(f' ** {self.bucket}/{filename} is not a valid URL ** ')
+            return
+
+        dst_file = filename
+        if dst_path:
+            if not os.path.isdir(dst_path):
+                raise FileNotFoundError(f'{dst_path} does not exist')
+            dst_file = os.path.join(dst_path, filename)
+
+        info: Dict[str, Any] = {}
+        if self.deposition_id is not None:
+            dep = await self._get_deposition(self.deposition_id)
+            info = next((f for f in dep.get('files', []) if f.get('filename') == filename), {})
+
+        part = f"{dst_file}.part"
+        r = await self._request("GET", f"{self.bucket}/{filename}")
+        async with r:
+            if r.status >= 400:
+                print(f" ** Something went wrong, check that {filename} is in your poject  ** ")
+                return
+            total = info.get('filesize', r.content_length)
+            algorithm, digest = parse_checksum(info['checksum']) if info.get('checksum') else (None, None)
+            hasher = hashlib.new(algorithm) if algorithm else None
+            loop = asyncio.get_event_loop()
+            written = 0
+            with open(part, 'wb') as f:
+                async for chunk in r.content.iter_chunked(chunk_size):
+                    # writing and hashing run on a worker thread so the event loop is never blocked on disk
+                    await loop.run_in_executor(None, _write_chunk, f, chunk, hasher)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(written, total)
+
+        if info.get('filesize') is not None and written != info['filesize']:
+            os.remove(part)
+            raise IOError(f"{dst_file} is {written} bytes, expected {info['filesize']}")
+        if hasher is not None and hasher.hexdigest() != digest:
+            os.remove(part)
+            raise IOError(f"{dst_file} does not match its {algorithm} checksum")
+        os.replace(part, dst_file)
+
+    async def publish(self):
+        """ publish a record
+
+        Returns:
+            dict: the published deposition
+        """
+        dep = await self._get_depositions_by_id()
+        return await self._json("POST", dep['links']['publish'])
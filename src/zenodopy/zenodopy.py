@@ -1,15 +1,66 @@
-import json
+import collections
+import contextlib
+import copy
+import importlib
+import mmap
 import os
+import queue
+import random
 from pathlib import Path
 import re
-import requests
+import shutil
+import struct
+import sys
+import tempfile
 import warnings
-import tarfile
-import zipfile
+import zlib
 from datetime import datetime
+import threading
 import time
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Any, Deque, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class _LazyModule(object):
+    """stand-in for a module that is imported on first attribute access
+
+    Keeps `import zenodopy` fast: the HTTP and archive stacks are only
+    imported once something uses them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+email_utils = _LazyModule('email.utils')
+futures = _LazyModule('concurrent.futures')
+hashlib = _LazyModule('hashlib')
+json = _LazyModule('json')
+requests = _LazyModule('requests')
+sqlite3 = _LazyModule('sqlite3')
+tarfile = _LazyModule('tarfile')
+zipfile = _LazyModule('zipfile')
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+ARCHIVE_BLOCK_SIZE = 1024 * 1024
+DEFLATE_WINDOW = 32 * 1024
+
+# already compressed formats, stored as they are by the parallel zip writer
+STORED_EXTENSIONS = ('.nc', '.nc4', '.png', '.jpg', '.jpeg', '.gif', '.gz', '.tgz', '.bz2',
+                     '.xz', '.zst', '.zip', '.7z', '.mp3', '.mp4')
 
 def validate_url(url):
     """validates if URL is formatted correctly
@@ -28,29 +79,895 @@ def validate_url(url):
     return re.match(regex, url) is not None
 
 
-def make_tarfile(output_file, source_dir):
+def make_tarfile(output_file, source_dir, compresslevel=9, workers=1):
     """tar a directory
     args
     -----
     output_file: path to output file
     source_dir: path to source directory
+    compresslevel: gzip compression level, 0 to 9
+    workers: number of threads compressing blocks of the tar stream
 
     returns
     -----
     tarred directory will be in output_file
     """
-    with tarfile.open(output_file, "w:gz") as tar:
+    if workers > 1:
+        with open(output_file, "wb") as f:
+            for chunk in iter_tarfile(source_dir, ARCHIVE_BLOCK_SIZE, compresslevel, workers):
+                f.write(chunk)
+        return
+
+    with tarfile.open(output_file, "w:gz", compresslevel=compresslevel) as tar:
         tar.add(source_dir, arcname=os.path.basename(source_dir))
 
 
-def make_zipfile(path, ziph):
-    # ziph is zipfile handle
+def make_session(pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, adapter=None):
+    """create a pooled HTTP session
+
+    Args:
+        pool_connections (int): number of per-host connection pools to cache
+        pool_maxsize (int): maximum number of connections kept per host
+        pool_block (bool): block when the pool is exhausted instead of
+            opening throw-away connections
+        keep_alive (bool): reuse connections between requests
+        adapter (requests.adapters.BaseAdapter): transport adapter to mount
+            instead of the default pooled HTTPAdapter (optional)
+
+    Returns:
+        requests.Session: session with the adapter mounted for http and https
+    """
+    session = requests.Session()
+    if adapter is None:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections,
+                                                pool_maxsize=pool_maxsize,
+                                                pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def stream_to_file(response, path, chunk_size=DOWNLOAD_CHUNK_SIZE, progress=None,
+                   offset=0, total=None, hasher=None, limiter=None):
+    """write a streamed response body to disk
+
+    The body is written to path starting at byte offset; anything
+    after offset is truncated first, so a partial file can be resumed.
+
+    Args:
+        response (requests.Response): response requested with stream=True
+        path (str): destination file
+        chunk_size (int): number of bytes read at a time
+        progress (callable): called as progress(bytes_written, total_bytes)
+            after every chunk, bytes_written includes offset (optional)
+        offset (int): number of bytes already present in path
+        total (int): expected size of the complete file, defaults to
+            offset plus the Content-Length of the response
+        hasher (hashlib hash): updated with every chunk written (optional)
+        limiter (BandwidthLimiter): caps the download rate (optional)
+
+    Returns:
+        int: size of the file after writing
+    """
+    if total is None and response.headers.get('Content-Length') is not None:
+        total = offset + int(response.headers['Content-Length'])
+    written = offset
+    with open(path, 'r+b' if offset else 'wb') as f:
+        f.seek(offset)
+        f.truncate()
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if limiter is not None:
+                limiter.acquire(len(chunk))
+            f.write(chunk)
+            written += len(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            if progress is not None:
+                progress(written, total)
+    return written
+
+
+def _content_range_start(headers):
+    """first byte of the range in a Content-Range header, None if it is missing or malformed"""
+    match = re.match(r'bytes (\d+)-\d+/(\d+|\*)$', headers.get('Content-Range', '').strip())
+    return int(match.group(1)) if match else None
+
+
+def parse_checksum(checksum):
+    """split a checksum reported by Zenodo into algorithm and digest
+
+    Depositions report a bare md5 digest, buckets and records
+    report it as 'md5:<digest>'.
+
+    Args:
+        checksum (str): checksum as returned by the API
+
+    Returns:
+        tuple: (algorithm, hex digest)
+    """
+    algorithm, _, digest = checksum.rpartition(':')
+    return (algorithm or 'md5'), digest
+
+
+def file_checksum(path, algorithm='md5', chunk_size=DOWNLOAD_CHUNK_SIZE, hasher=None):
+    """hash the content of a file
+
+    Args:
+        path (str): file to hash
+        algorithm (str): hashlib algorithm name
+        chunk_size (int): number of bytes read at a time
+        hasher (hashlib hash): hash object to update instead of a new one (optional)
+
+    Returns:
+        hashlib hash: hash object updated with the file content
+    """
+    hasher = hashlib.new(algorithm) if hasher is None else hasher
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher
+
+
+def transfer_report(results, seconds):
+    """aggregate the per file results of a batch transfer
+
+    Args:
+        results (list): dicts with filename, bytes, seconds and error
+        seconds (float): wall-clock duration of the batch
+
+    Returns:
+        dict: results under 'files', the number of 'failed' files,
+            total 'bytes', 'seconds' and 'throughput' in bytes/s
+    """
+    nbytes = sum(r['bytes'] for r in results)
+    return {
+        'files': results,
+        'failed': sum(r['error'] is not None for r in results),
+        'bytes': nbytes,
+        'seconds': seconds,
+        'throughput': nbytes / seconds if seconds > 0 else 0.0,
+    }
+
+
+def _transfer_file(filename, transfer, retries, retryable):
+    """run the transfer of one file of a batch
+
+    Connection errors and retryable statuses are already retried by the
+    client's RetryPolicy, transfer is only called again after an error
+    for which retryable(error) is true.
+
+    Args:
+        filename (str): name of the file in the report
+        transfer (callable): transfers the file, returns its size in bytes
+        retries (int): number of times transfer is called again
+        retryable (callable): whether an error is worth another attempt
+
+    Returns:
+        dict: filename, bytes, seconds and error of the transfer
+    """
+    start = time.monotonic()
+    result = {'filename': filename, 'bytes': 0, 'seconds': 0.0, 'error': None}
+    for attempt in range(retries + 1):
+        try:
+            result['bytes'] = transfer()
+            result['error'] = None
+            break
+        except (requests.exceptions.RequestException, IOError) as e:
+            result['error'] = e
+            if not retryable(e):
+                break
+    result['seconds'] = time.monotonic() - start
+    return result
+
+
+def _mismatch(error):
+    """whether error is a size or checksum mismatch rather than a failed request"""
+    return not isinstance(error, requests.exceptions.RequestException)
+
+
+def _broken_download(error):
+    """whether a download is worth another attempt: cut mid-body, or truncated or corrupted"""
+    return isinstance(error, requests.exceptions.ChunkedEncodingError) or _mismatch(error)
+
+
+def _smallest_first(executor, func, items, sizes):
+    """executor.map(func, items) starting with the smallest items
+
+    Small transfers are not queued behind large ones when there are more
+    items than workers. The results are in the order of items.
+    """
+    order = sorted(range(len(items)), key=lambda i: sizes[i] or 0)
+    results = [None] * len(items)
+    for i, result in zip(order, executor.map(func, [items[i] for i in order])):
+        results[i] = result
+    return results
+
+
+def _throttle(chunks, limiter):
+    """yield chunks once limiter granted their bandwidth"""
+    for chunk in chunks:
+        limiter.acquire(len(chunk))
+        yield chunk
+
+
+def _paginate(fetch, prefetch=False):
+    """yield the items of successive pages returned by fetch
+
+    Iteration stops after the last page reported by fetch, or at the
+    first empty page. The length of a page says nothing about what
+    follows, since the server may cap the requested page size.
+
+    Args:
+        fetch (callable): takes a 1-based page number and returns the
+            list of items of that page and whether another page follows
+        prefetch (bool): request the next page in a background thread
+            while the items of the current page are consumed
+
+    Yields:
+        items of each page
+    """
+    executor = futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = 1
+        items, more = fetch(page)
+        while isinstance(items, list) and items:
+            pending = executor.submit(fetch, page + 1) if executor is not None and more else None
+            yield from items
+            if not more:
+                return
+            page += 1
+            items, more = pending.result() if pending is not None else fetch(page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _zip_members(path):
+    """(file path, archive name) of every file make_zipfile adds"""
     for root, dirs, files in os.walk(path):
         for file in files:
-            ziph.write(os.path.join(root, file),
-                       os.path.relpath(os.path.join(root, file),
-                                       os.path.join(path, '..')))
-            
+            yield (os.path.join(root, file),
+                   os.path.relpath(os.path.join(root, file),
+                                   os.path.join(path, '..')))
+
+
+def _check_unique_names(paths):
+    """raise ValueError if two paths have the same file name, they would be the same project file"""
+    names = [os.path.basename(path) for path in paths]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"files must have unique names, found duplicates: {sorted(duplicates)}")
+
+
+def _walk_files(path):
+    """sorted paths of every file in a directory tree"""
+    return sorted(os.path.join(root, file)
+                  for root, dirs, files in os.walk(path)
+                  for file in files)
+
+
+def _local_path(directory, filename):
+    """path of a remote file in directory
+
+    File names come from the server, a name that is not a plain file
+    name (absolute, with a separator or a drive, '.' or '..') could
+    write outside directory and raises ValueError.
+    """
+    if (not filename or filename in ('.', '..') or '/' in filename or '\\' in filename
+            or os.path.isabs(filename) or os.path.splitdrive(filename)[0]):
+        raise ValueError(f"refusing to use the remote file name {filename!r} as a local path")
+    return os.path.join(directory, filename)
+
+
+def make_zipfile(path, ziph):
+    # ziph is zipfile handle
+    for file, arcname in _zip_members(path):
+        ziph.write(file, arcname)
+
+
+def zip_stored_size(path):
+    """exact size of the uncompressed zip that iter_zipfile streams for path
+
+    Mirrors the layout zipfile writes to a non-seekable stream: a local
+    header, the data and a data descriptor per member, followed by the
+    central directory and the end records.
+
+    Args:
+        path (str): path to the directory
+
+    Returns:
+        int: size of the archive in bytes
+    """
+    offset = central = count = 0
+    for file, arcname in _zip_members(path):
+        zinfo = zipfile.ZipInfo.from_file(file, arcname)
+        try:
+            name = len(zinfo.filename.encode('ascii'))
+        except UnicodeEncodeError:
+            name = len(zinfo.filename.encode('utf-8'))
+        size = zinfo.file_size
+        zip64 = size * 1.05 > zipfile.ZIP64_LIMIT
+        # zip64 fields in the central directory record
+        fields = (2 if size > zipfile.ZIP64_LIMIT else 0) + (1 if offset > zipfile.ZIP64_LIMIT else 0)
+        central += 46 + name + (4 + 8 * fields if fields else 0)
+        offset += 30 + name + (20 if zip64 else 0) + size + (24 if zip64 else 16)
+        count += 1
+
+    end = 22
+    if count > zipfile.ZIP_FILECOUNT_LIMIT or offset > zipfile.ZIP64_LIMIT or central > zipfile.ZIP64_LIMIT:
+        end += 56 + 20
+    return offset + central + end
+
+
+class _PipeWriter(object):
+    """write-only file object handing its output to a queue in chunks"""
+
+    def __init__(self, chunks, stop, chunk_size):
+        self._chunks = chunks
+        self._stop = stop
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._put(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                return self._chunks.put(item, timeout=0.1)
+            except queue.Full:
+                pass
+        raise IOError("archive stream was closed by the reader")
+
+
+def iter_archive(write_archive, chunk_size=DOWNLOAD_CHUNK_SIZE, max_chunks=8):
+    """stream the output of an archive writer without touching the disk
+
+    write_archive runs in a background thread and writes into a pipe.
+    At most max_chunks chunks are buffered, so memory use is bounded
+    and the writer is paced by the reader.
+
+    Args:
+        write_archive (callable): called with a write-only file object
+        chunk_size (int): size of the chunks yielded
+        max_chunks (int): number of chunks buffered ahead of the reader
+
+    Yields:
+        bytes: the archive content
+    """
+    chunks: queue.Queue[Any] = queue.Queue(maxsize=max_chunks)
+    stop = threading.Event()
+    done = object()
+    pipe = _PipeWriter(chunks, stop, chunk_size)
+
+    def produce():
+        try:
+            write_archive(pipe)
+            pipe.close()
+            pipe._put(done)
+        except BaseException as e:
+            if not stop.is_set():
+                pipe._put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_zipfile(path, compression=None, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """stream a zip of a directory, see iter_archive
+
+    Args:
+        path (str): path to the directory
+        compression (int): zipfile compression method, defaults to ZIP_DEFLATED
+        chunk_size (int): size of the chunks yielded
+
+    Yields:
+        bytes: the archive content
+    """
+    if compression is None:
+        compression = zipfile.ZIP_DEFLATED
+
+    def write(fileobj):
+        with zipfile.ZipFile(fileobj, 'w', compression) as zipf:
+            make_zipfile(path, zipf)
+    return iter_archive(write, chunk_size)
+
+
+def iter_tarfile(source_dir, chunk_size=DOWNLOAD_CHUNK_SIZE, compresslevel=9, workers=1):
+    """stream a gzipped tar of a directory, see iter_archive
+
+    The tar stream is compressed with iter_gzip, so with workers > 1
+    its blocks are deflated concurrently.
+
+    Args:
+        source_dir (str): path to the directory
+        chunk_size (int): size of the chunks compressed and yielded
+        compresslevel (int): gzip compression level, 0 to 9
+        workers (int): number of threads compressing blocks
+
+    Yields:
+        bytes: the archive content
+    """
+    def write(fileobj):
+        with tarfile.open(fileobj=fileobj, mode="w|") as tar:
+            tar.add(source_dir, arcname=os.path.basename(source_dir))
+    return iter_gzip(iter_archive(write, chunk_size), compresslevel=compresslevel, workers=workers)
+
+
+def _deflate_block(block, level, zdict=b'', last=True):
+    """raw deflate a block, ending on a byte boundary unless it is the last one
+
+    Blocks compressed this way concatenate into a single valid deflate
+    stream, priming with the tail of the previous block keeps the ratio
+    close to a serial compressor.
+    """
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                      zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def parallel_deflate(blocks, executor, level=6, max_pending=8):
+    """raw deflate an iterable of blocks, compressing blocks concurrently
+
+    zlib releases the GIL while compressing, so blocks compressed on a
+    thread pool use several cores.
+
+    Args:
+        blocks (iterable): bytes to compress, in order
+        executor (concurrent.futures.Executor): compresses the blocks
+        level (int): compression level, 0 to 9
+        max_pending (int): number of blocks compressed ahead of the reader
+
+    Yields:
+        bytes: the compressed stream
+
+    Returns:
+        tuple: (crc32, size) of the uncompressed data
+    """
+    crc = size = 0
+    pending: Deque[Any] = collections.deque()
+    previous = b''
+    blocks = iter(blocks)
+    block = next(blocks, b'')
+    while True:
+        following = next(blocks, None)
+        last = following is None
+        crc = zlib.crc32(block, crc)
+        size += len(block)
+        pending.append(executor.submit(_deflate_block, block, level, previous[-DEFLATE_WINDOW:], last))
+        previous = block
+        while pending and (last or len(pending) >= max_pending):
+            yield pending.popleft().result()
+        if last:
+            return crc, size
+        block = following
+
+
+def iter_gzip(blocks, compresslevel=9, workers=1):
+    """gzip an iterable of blocks, pigz style
+
+    Args:
+        blocks (iterable): bytes to compress, in order
+        compresslevel (int): compression level, 0 to 9
+        workers (int): number of threads compressing blocks
+
+    Yields:
+        bytes: the gzip stream
+    """
+    xfl = {1: 4, 9: 2}.get(compresslevel, 0)
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        yield b'\x1f\x8b\x08\x00' + struct.pack('<L', int(time.time())) + bytes([xfl, 255])
+        crc, size = yield from parallel_deflate(blocks, executor, compresslevel, max_pending=2 * workers)
+        yield struct.pack('<LL', crc, size & 0xffffffff)
+
+
+def _read_blocks(file, block_size):
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            yield block
+
+
+def _compress_member(file, level, store):
+    """read and compress a whole file, returns (data, crc32, size)"""
+    with open(file, 'rb') as f:
+        data = f.read()
+    return (data if store else _deflate_block(data, level)), zlib.crc32(data), len(data)
+
+
+def _member_result(future):
+    data, crc, size = future.result()
+    if data:
+        yield data
+    return crc, size
+
+
+def _stored_member(blocks):
+    crc = size = 0
+    for block in blocks:
+        crc = zlib.crc32(block, crc)
+        size += len(block)
+        yield block
+    return crc, size
+
+
+def _encode_filename(zinfo):
+    try:
+        return zinfo.filename.encode('ascii'), zinfo.flag_bits
+    except UnicodeEncodeError:
+        return zinfo.filename.encode('utf-8'), zinfo.flag_bits | 0x800
+
+
+def _zip_central_directory(entries, offset):
+    """central directory and end records of a zip whose members end at offset"""
+    records = []
+    for zinfo in entries:
+        extra = []
+        file_size, compress_size, header_offset = zinfo.file_size, zinfo.compress_size, zinfo.header_offset
+        if file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT:
+            extra += [file_size, compress_size]
+            file_size = compress_size = 0xffffffff
+        if header_offset > zipfile.ZIP64_LIMIT:
+            extra.append(header_offset)
+            header_offset = 0xffffffff
+
+        extra_data = zinfo.extra
+        min_version = 0
+        if extra:
+            extra_data = struct.pack('<HH' + 'Q' * len(extra), 1, 8 * len(extra), *extra) + extra_data
+            min_version = zipfile.ZIP64_VERSION
+
+        dt = zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        filename, flag_bits = _encode_filename(zinfo)
+        records.append(struct.pack(
+            zipfile.structCentralDir, zipfile.stringCentralDir,
+            max(min_version, zinfo.create_version), zinfo.create_system,
+            max(min_version, zinfo.extract_version), zinfo.reserved, flag_bits,
+            zinfo.compress_type, dostime, dosdate, zinfo.CRC, compress_size, file_size,
+            len(filename), len(extra_data), len(zinfo.comment), 0,
+            zinfo.internal_attr, zinfo.external_attr, header_offset,
+        ) + filename + extra_data + zinfo.comment)
+
+    central = b''.join(records)
+    count, size = len(entries), len(central)
+    end = b''
+    if count > zipfile.ZIP_FILECOUNT_LIMIT or offset > zipfile.ZIP64_LIMIT or size > zipfile.ZIP64_LIMIT:
+        end += struct.pack(zipfile.structEndArchive64, zipfile.stringEndArchive64,
+                           44, 45, 45, 0, 0, count, count, size, offset)
+        end += struct.pack(zipfile.structEndArchive64Locator, zipfile.stringEndArchive64Locator,
+                           0, offset + size, 1)
+        count, size, offset = min(count, 0xffff), min(size, 0xffffffff), min(offset, 0xffffffff)
+    end += struct.pack(zipfile.structEndArchive, zipfile.stringEndArchive,
+                       0, 0, count, count, size, offset, 0)
+    return central + end
+
+
+def iter_parallel_zipfile(path, compresslevel=6, workers=None, block_size=ARCHIVE_BLOCK_SIZE,
+                          stored_extensions=STORED_EXTENSIONS):
+    """stream a zip of a directory, deflating on a thread pool
+
+    Files up to block_size are compressed whole, several at a time.
+    Larger files are split into blocks compressed concurrently. Files
+    whose extension is in stored_extensions are stored as they are.
+
+    Args:
+        path (str): path to the directory
+        compresslevel (int): deflate compression level, 0 to 9
+        workers (int): number of compressing threads, defaults to the number of CPUs
+        block_size (int): size of the blocks compressed at once
+        stored_extensions (tuple): extensions of files stored without compression
+
+    Yields:
+        bytes: the archive content
+    """
+    workers = workers or os.cpu_count() or 1
+    stored_extensions = tuple(ext.lower() for ext in stored_extensions)
+    entries = []
+    offset = 0
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        def schedule(file, arcname):
+            zinfo = zipfile.ZipInfo.from_file(file, arcname)
+            store = file.lower().endswith(stored_extensions)
+            zinfo.compress_type = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+            zinfo.flag_bits = 0x08  # sizes and crc follow the data
+            if zinfo.file_size <= block_size:
+                body = _member_result(executor.submit(_compress_member, file, compresslevel, store))
+            elif store:
+                body = _stored_member(_read_blocks(file, block_size))
+            else:
+                body = parallel_deflate(_read_blocks(file, block_size), executor,
+                                        compresslevel, max_pending=2 * workers)
+            return zinfo, body
+
+        # small files are submitted ahead so they compress side by side
+        scheduled: Deque[Tuple[Any, Any]] = collections.deque()
+        members = _zip_members(path)
+        while True:
+            while len(scheduled) < 2 * workers:
+                member = next(members, None)
+                if member is None:
+                    break
+                scheduled.append(schedule(*member))
+                if scheduled[-1][0].file_size > block_size:
+                    break
+            if not scheduled:
+                break
+
+            zinfo, body = scheduled.popleft()
+            zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+            zinfo.header_offset = offset
+            header = zinfo.FileHeader(zip64)
+            yield header
+
+            compress_size = 0
+            while True:
+                try:
+                    chunk = next(body)
+                except StopIteration as stop:
+                    crc, size = stop.value
+                    break
+                compress_size += len(chunk)
+                yield chunk
+
+            if not zip64 and (size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT):
+                raise zipfile.LargeZipFile(f"{zinfo.filename} grew past the ZIP64 limit while archiving")
+            zinfo.CRC, zinfo.compress_size, zinfo.file_size = crc, compress_size, size
+            descriptor = struct.pack('<LLQQ' if zip64 else '<LLLL', 0x08074b50, crc, compress_size, size)
+            yield descriptor
+
+            offset += len(header) + compress_size + len(descriptor)
+            entries.append(zinfo)
+
+    yield _zip_central_directory(entries, offset)
+
+
+class SizedStream(object):
+    """request body of known length built from an iterable of bytes
+
+    requests sends it with a Content-Length header instead of chunked
+    transfer encoding. Iteration fails if the iterable does not yield
+    exactly length bytes.
+    """
+
+    def __init__(self, chunks, length):
+        self._chunks = chunks
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        sent = 0
+        for chunk in self._chunks:
+            sent += len(chunk)
+            if sent > self._length:
+                raise IOError(f"stream is longer than the announced {self._length} bytes")
+            yield chunk
+        if sent != self._length:
+            raise IOError(f"stream is {sent} bytes, announced {self._length}")
+
+
+class FileBody(object):
+    """request body sending a local file in large memory-mapped chunks
+
+    The file is mapped in memory and sent as memoryview slices of
+    chunk_size bytes, so the socket gets large buffers without copies
+    in Python. The checksums listed in algorithms are computed in a
+    background thread from the same slices while they are being sent,
+    the file is read only once. requests sends it with a Content-Length
+    header and every iteration starts over, so the body can be retried.
+    progress is called as progress(bytes_sent, total_bytes) after every
+    chunk, a BandwidthLimiter passed as limiter paces the chunks.
+    """
+
+    def __init__(self, path, chunk_size=UPLOAD_CHUNK_SIZE, algorithms=('md5',), progress=None, limiter=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.algorithms = tuple(algorithms)
+        self.progress = progress
+        self.limiter = limiter
+        self._length = os.path.getsize(path)
+        self._hashers = {}
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        self._hashers = hashers = {name: hashlib.new(name) for name in self.algorithms}
+        if self._length == 0:
+            return
+
+        def digest(chunk):
+            for hasher in hashers.values():
+                hasher.update(chunk)
+
+        with open(self.path, 'rb') as f:
+            # not closed explicitly, the slices handed out may outlive the
+            # iteration and the map is released with the last of them
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        if len(view) != self._length:
+            raise IOError(f"{self.path} changed size during the upload")
+
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
+            for start in range(0, self._length, self.chunk_size):
+                chunk = view[start:start + self.chunk_size]
+                if self.limiter is not None:
+                    self.limiter.acquire(len(chunk))
+                if pending is not None:
+                    pending.result()
+                pending = executor.submit(digest, chunk) if hashers else None
+                yield chunk
+                if self.progress is not None:
+                    self.progress(min(start + self.chunk_size, self._length), self._length)
+            if pending is not None:
+                pending.result()
+
+    def hexdigest(self, algorithm='md5'):
+        """checksum of the content sent by the last complete iteration"""
+        return self._hashers[algorithm].hexdigest()
+
+
+@dataclass
+class TransferStatus:
+    """state of a transfer reported by ProgressReporter
+
+    Rates are in bytes/s: rate over the last seconds of the transfer,
+    average since it started. eta is in seconds, None while unknown.
+    """
+    name: Optional[str]
+    bytes: int
+    total: Optional[int]
+    elapsed: float
+    rate: float
+    average: float
+    eta: Optional[float] = None
+    done: bool = False
+    stalled: bool = False
+
+    def __str__(self):
+        size = f"{self.bytes / 1e6:.1f}" + (f"/{self.total / 1e6:.1f}" if self.total else "")
+        eta = f" ETA {int(self.eta) // 3600}:{int(self.eta) % 3600 // 60:02d}:{int(self.eta) % 60:02d}" \
+            if self.eta is not None else ""
+        state = " done" if self.done else " STALLED" if self.stalled else ""
+        return (f"{self.name or 'transfer'}: {size} MB {self.rate / 1e6:.2f} MB/s "
+                f"(avg {self.average / 1e6:.2f} MB/s){eta}{state}")
+
+
+class ProgressReporter(object):
+    """progress callback reporting throughput and ETA at a limited rate
+
+    Pass it wherever a progress(bytes_done, total_bytes) callback is
+    accepted. A call only reads the clock; at most every interval
+    seconds, and once the transfer completes, callback is called with a
+    TransferStatus. With stall_timeout, a watchdog thread reports a
+    stalled status when no bytes were transferred for that many seconds.
+
+        ```
+        zeno.download_file('data.nc', progress=zenodopy.ProgressReporter(print, stall_timeout=60))
+        ```
+
+    Args:
+        callback (callable): called with a TransferStatus
+        interval (float): minimum seconds between two reports
+        window (float): seconds over which the current rate is measured
+        name (str): name of the transfer in the reports (optional)
+        stall_timeout (float): seconds without progress after which the
+            transfer is reported as stalled (optional)
+    """
+
+    def __init__(self, callback, interval=1.0, window=10.0, name=None, stall_timeout=None):
+        self.callback = callback
+        self.interval = interval
+        self.window = window
+        self.name = name
+        self.stall_timeout = stall_timeout
+        self._lock = threading.Lock()
+        self._samples: Deque[Tuple[float, int]] = collections.deque()
+        self._start = None
+        self._next = 0.0
+        self._bytes = 0
+        self._total = None
+        self._changed = 0.0
+        self._finished = False
+        self._stop = threading.Event()
+
+    def __call__(self, done, total=None):
+        now = time.monotonic()
+        if self._start is None:
+            self._begin(now)
+        if done != self._bytes:
+            self._bytes = done
+            self._changed = now
+        self._total = total
+        finished = total is not None and done >= total
+        if now >= self._next or finished:
+            self._report(now, done=finished)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """report the final status and stop the watchdog"""
+        if self._start is not None:
+            self._report(time.monotonic(), done=True)
+        self._stop.set()
+
+    def _begin(self, now):
+        with self._lock:
+            if self._start is not None:
+                return
+            self._start = self._changed = now
+            self._samples.append((now, 0))
+        if self.stall_timeout:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        while not self._stop.wait(min(self.interval, self.stall_timeout)):
+            now = time.monotonic()
+            if now - self._changed >= self.stall_timeout:
+                self._report(now, stalled=True)
+
+    def _report(self, now, done=False, stalled=False):
+        with self._lock:
+            if self._finished:
+                return
+            self._next = now + self.interval
+            samples = self._samples
+            samples.append((now, self._bytes))
+            while len(samples) > 2 and now - samples[1][0] >= self.window:
+                samples.popleft()
+            then, before = samples[0]
+            rate = (self._bytes - before) / (now - then) if now > then else 0.0
+            elapsed = now - self._start
+            average = self._bytes / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self._total is not None:
+                remaining = max(self._total - self._bytes, 0)
+                speed = rate or average
+                eta = remaining / speed if speed > 0 else (0.0 if remaining == 0 else None)
+            status = TransferStatus(self.name, self._bytes, self._total, elapsed, rate, average, eta,
+                                    done=done, stalled=stalled)
+            if done:
+                self._finished = True
+                self._stop.set()
+        self.callback(status)
+
+
 @dataclass
 class ZenodoMetadata:
     title: str
@@ -78,14 +995,564 @@ class ZenodoMetadata:
         return cls(**metadata_dict)
     
 
-class BearerAuth(requests.auth.AuthBase):
-    """Bearer Authentication"""
+@dataclass
+class RetryPolicy:
+    """when and how long to wait before retrying a request
+
+    Failed requests are retried with exponential backoff and full jitter.
+    A Retry-After header, or an exhausted X-RateLimit-Remaining with its
+    X-RateLimit-Reset, takes precedence over the backoff.
+    """
+    retries: int = 5
+    backoff: float = 0.5
+    max_backoff: float = 60.0
+    statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    # a request with any other method (e.g. a POST creating a deposition or
+    # publishing it) may have been acted on by the server before it failed
+    idempotent_methods: Tuple[str, ...] = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+    # statuses telling that the server did not act on a request
+    rejected_statuses: Tuple[int, ...] = (429,)
+
+    def should_retry(self, attempt, status=None, method=None, sent=True):
+        """whether a request that failed on the given 0-based attempt is retried
+
+        A request that is not idempotent is only retried when it certainly
+        had no effect: it was rejected with one of rejected_statuses, or it
+        failed before it reached the server.
+
+        Args:
+            attempt (int): 0-based attempt that failed
+            status (int): response status, None for a connection error
+            method (str): HTTP method of the request, None counts as idempotent
+            sent (bool): False if the connection error happened before the request was sent
+        """
+        if attempt >= self.retries:
+            return False
+        if method is not None and method.upper() not in self.idempotent_methods:
+            return not sent if status is None else status in self.rejected_statuses
+        return status is None or status in self.statuses
+
+    def delay(self, attempt, headers=None):
+        """seconds to wait before retrying after the given 0-based attempt
+
+        Args:
+            attempt (int): 0-based attempt that failed
+            headers (dict): headers of the failed response (optional)
+        """
+        if headers is not None:
+            wait = _header_delay(headers)
+            if wait is not None:
+                return min(wait, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+def _unsent(error):
+    """whether a requests exception was raised before the request reached the server"""
+    from urllib3.exceptions import NewConnectionError
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+def _header_delay(headers):
+    """seconds to wait according to Retry-After or X-RateLimit-* headers, None if absent"""
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, email_utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+        try:
+            return max(0.0, float(headers['X-RateLimit-Reset']) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+class RateLimiter(object):
+    """token bucket pacing requests to stay under the API rate limits
+
+    Zenodo allows 100 requests per minute to its REST API. The bucket
+    holds up to `capacity` tokens refilled at `rate` tokens per second;
+    every request takes one, waiting for it if the bucket is empty. The
+    limiter also pauses every request when a response reports that the
+    server side budget is exhausted.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (int): maximum burst of requests
+    """
+
+    def __init__(self, rate=100 / 60, capacity=100):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """take a token, returns the seconds to wait before sending the request"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.0)
+            self._tokens -= 1
+        return wait
+
+    def acquire(self):
+        """wait until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def update(self, headers):
+        """pause requests until the reset time when the server budget is exhausted"""
+        if headers.get('X-RateLimit-Remaining') != '0':
+            return
+        wait = _header_delay({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': headers.get('X-RateLimit-Reset')})
+        if wait:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+
+
+class BandwidthLimiter(object):
+    """caps the bytes per second of every transfer sharing it
+
+    One limiter can be shared by several clients and threads. Transfers
+    take bandwidth in quanta of at most `quantum` bytes, each reserving
+    the next free slot of the link. A transfer asks for its next quantum
+    only once the previous one was granted, so concurrent transfers are
+    served in turn and share the cap evenly: a small file is not held
+    back behind a large one.
+
+        ```
+        zeno = zenodopy.Client(bandwidth=50e6)  # 50 MB/s for all transfers
+        ```
+
+    Args:
+        rate (float): bytes per second
+        quantum (int): largest number of bytes granted at once
+        burst (int): bytes that may be sent without waiting after an
+            idle period, defaults to quantum
+    """
+
+    def __init__(self, rate, quantum=256 * 1024, burst=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be a positive number of bytes per second, got {rate}")
+        self.rate = float(rate)
+        self.quantum = quantum
+        self.burst = quantum if burst is None else burst
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes):
+        """take nbytes (at most one quantum), returns the seconds to wait before sending them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= nbytes
+            return max(-self._tokens / self.rate, 0.0)
+
+    def acquire(self, nbytes):
+        """wait until nbytes may be sent"""
+        while nbytes > 0:
+            take = min(nbytes, self.quantum)
+            wait = self.reserve(take)
+            if wait > 0:
+                time.sleep(wait)
+            nbytes -= take
+
+
+@dataclass
+class RequestEvent:
+    """an HTTP call made by Client, passed to every request hook
+
+    For streamed responses (downloads) duration ends when the headers
+    arrive and bytes_received is the announced Content-Length.
+    """
+    method: str
+    url: str
+    endpoint: str
+    status: Optional[int] = None
+    bytes_sent: Optional[int] = None
+    bytes_received: Optional[int] = None
+    retries: int = 0
+    start: float = 0.0
+    duration: float = 0.0
+    error: Optional[BaseException] = None
+
+
+_ENDPOINTS = [
+    (r'/deposit/depositions/\d+/actions/(\w+)', r'/deposit/depositions/{id}/actions/\1'),
+    (r'/deposit/depositions/\d+/files/[^/]+', '/deposit/depositions/{id}/files/{file_id}'),
+    (r'/deposit/depositions/\d+', '/deposit/depositions/{id}'),
+    (r'/records/\d+/files/[^/]+/content', '/records/{id}/files/{key}/content'),
+    (r'/records/\d+', '/records/{id}'),
+    (r'/files/[^/]+/[^/]+', '/files/{bucket}/{key}'),
+    (r'/files/[^/]+', '/files/{bucket}'),
+]
+
+
+def endpoint_template(url):
+    """path of url with IDs, buckets and file names replaced by placeholders
+
+        ```
+        endpoint_template('https://zenodo.org/api/deposit/depositions/42/actions/publish')
+        # '/api/deposit/depositions/{id}/actions/publish'
+        ```
+    """
+    path = urlsplit(url).path
+    for pattern, template in _ENDPOINTS:
+        endpoint, n = re.subn(f"{pattern}$", template, path)
+        if n:
+            return endpoint
+    return path
+
+
+def _count_bytes(chunks, counter):
+    """yield chunks, adding their size to counter[0]"""
+    for chunk in chunks:
+        counter[0] += len(chunk)
+        yield chunk
+
+
+class RequestStats(object):
+    """request hook aggregating counters and latency histograms per endpoint
+
+        ```
+        stats = zenodopy.RequestStats()
+        zeno = zenodopy.Client(hooks=[stats])
+        ...
+        stats.snapshot()['POST /api/deposit/depositions/{id}/actions/publish']
+        ```
+
+    Args:
+        buckets (tuple): upper bounds in seconds of the latency histogram bins,
+            slower requests fall in a last open bin
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __call__(self, event):
+        key = f"{event.method} {event.endpoint}"
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {'count': 0, 'errors': 0, 'retries': 0, 'bytes_sent': 0,
+                                            'bytes_received': 0, 'seconds': 0.0, 'max': 0.0,
+                                            'histogram': [0] * (len(self.buckets) + 1)}
+            stats['count'] += 1
+            stats['errors'] += event.error is not None or (event.status or 0) >= 400
+            stats['retries'] += event.retries
+            stats['bytes_sent'] += event.bytes_sent or 0
+            stats['bytes_received'] += event.bytes_received or 0
+            stats['seconds'] += event.duration
+            stats['max'] = max(stats['max'], event.duration)
+            stats['histogram'][sum(event.duration > bound for bound in self.buckets)] += 1
+
+    def snapshot(self):
+        """statistics per 'METHOD endpoint'
+
+        Returns:
+            dict: count, errors, retries, bytes_sent, bytes_received, total
+                seconds, mean and max duration and the histogram counts
+                (one per bucket plus the open last bin) of every endpoint
+        """
+        with self._lock:
+            return {key: dict(stats, histogram=list(stats['histogram']), mean=stats['seconds'] / stats['count'])
+                    for key, stats in self._stats.items()}
+
+    def reset(self):
+        """forget every recorded request"""
+        with self._lock:
+            self._stats = {}
+
+
+class SpanHook(object):
+    """request hook recording every request as an OpenTelemetry style span
+
+    Works with an opentelemetry.trace.Tracer or anything providing
+    start_span(name, start_time=..., attributes=...) returning spans with
+    set_attribute, record_exception and end(end_time=...).
+
+        ```
+        from opentelemetry import trace
+        zeno = zenodopy.Client(hooks=[zenodopy.SpanHook(trace.get_tracer("zenodopy"))])
+        ```
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def __call__(self, event):
+        start = int(event.start * 1e9)
+        attributes = {
+            'http.request.method': event.method,
+            'http.route': event.endpoint,
+            'url.full': event.url,
+            'http.request.resend_count': event.retries,
+        }
+        if event.status is not None:
+            attributes['http.response.status_code'] = event.status
+        if event.bytes_sent is not None:
+            attributes['http.request.body.size'] = event.bytes_sent
+        if event.bytes_received is not None:
+            attributes['http.response.body.size'] = event.bytes_received
+        span = self.tracer.start_span(f"{event.method} {event.endpoint}", start_time=start, attributes=attributes)
+        if event.error is not None:
+            span.record_exception(event.error)
+        if event.error is not None or (event.status or 0) >= 400:
+            span.set_attribute('error.type', type(event.error).__name__ if event.error else str(event.status))
+        span.end(end_time=start + int(event.duration * 1e9))
+
+
+def default_cache_dir():
+    """directory for zenodopy's persistent caches
+
+    ZENODOPY_CACHE_DIR if set, else zenodopy under XDG_CACHE_HOME or ~/.cache
+    """
+    if os.environ.get("ZENODOPY_CACHE_DIR"):
+        return os.path.expanduser(os.environ["ZENODOPY_CACHE_DIR"])
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "zenodopy")
+
+
+class RecordCache(object):
+    """persistent cache of published record metadata, shared across processes
+
+    Published records do not change, so they are stored in a SQLite
+    database keyed by record URL. A concept record id resolves to the
+    latest version, which does change, so only the version it resolved
+    to is stored. When the stored records exceed max_bytes the least
+    recently used ones are evicted.
+
+    Args:
+        cache_dir (str): directory of the database, defaults to default_cache_dir()
+        max_bytes (int): maximum total size of the stored records
+        offline (bool): never go to the network for a record, a record
+            missing from the cache raises LookupError
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 * 1024, offline=False):
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.offline = offline
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, "records.sqlite")
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS records "
+                       "(id TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS records_accessed ON records (accessed)")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return contextlib.closing(db)
+
+    def get(self, record_id):
+        """cached record, None if it is not cached
+
+        Args:
+            record_id (str): key of the record, Client uses the record URL
+        """
+        with self._connect() as db, db:
+            row = db.execute("SELECT data FROM records WHERE id = ?", (str(record_id),)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE records SET accessed = ? WHERE id = ?", (time.time(), str(record_id)))
+        return json.loads(row[0])
+
+    def put(self, record_id, record):
+        """store a record and evict the least recently used ones above max_bytes"""
+        data = json.dumps(record)
+        with self._connect() as db, db:
+            db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                       (str(record_id), data, len(data), time.time()))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM records").fetchone()[0]
+            for evict_id, size in db.execute("SELECT id, size FROM records ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM records WHERE id = ?", (evict_id,))
+                total -= size
+
+    def clear(self):
+        """remove every cached record"""
+        with self._connect() as db, db:
+            db.execute("DELETE FROM records")
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """exclusive lock on path held across processes"""
+    with open(path, 'a+b') as f:
+        if sys.platform == 'win32':
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileCache(object):
+    """content-addressed cache of downloaded files, shared across processes
+
+    Files are stored under the checksum Zenodo reports for them, so the
+    same file reached through any record, version or process is only
+    downloaded once. Downloads are copied into the cache, and cached files
+    are handed out as hard links or copies. A hard link shares the cached
+    file, which is read-only so it cannot be changed through the link;
+    eviction makes it writable again. When the cache exceeds max_bytes
+    the least recently used files are evicted.
+
+    Args:
+        cache_dir (str): cache directory, defaults to default_cache_dir()
+        max_bytes (int): maximum total size of the cached files
+        link (bool): hard link cached files into place instead of copying
+            them, falls back to a copy across file systems. Ignored on
+            Windows, where a read-only file cannot be replaced or removed
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=10 * 1024 ** 3, link=True):
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.link = link and sys.platform != "win32"
+        self._files = os.path.join(self.cache_dir, "files")
+        self._locks = os.path.join(self.cache_dir, "locks")
+        os.makedirs(self._files, exist_ok=True)
+        os.makedirs(self._locks, exist_ok=True)
+
+    def path(self, checksum):
+        """location of the cached file for a checksum"""
+        algorithm, digest = parse_checksum(checksum)
+        return os.path.join(self._files, algorithm, digest[:2], digest)
+
+    @contextlib.contextmanager
+    def lock(self, checksum):
+        """hold the lock for a checksum, so only one worker downloads it"""
+        algorithm, digest = parse_checksum(checksum)
+        path = os.path.join(self._locks, algorithm, digest[:2], f"{digest}.lock")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _file_lock(path):
+            yield
+
+    def fetch(self, checksum, dst_file):
+        """put the cached file for checksum at dst_file
+
+        Returns:
+            bool: False if the file is not cached
+        """
+        src = self.path(checksum)
+        tmp = f"{dst_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self._place(src, tmp)
+        except FileNotFoundError:
+            return False
+        try:
+            # mark the file as recently used, it may have been evicted since it was placed
+            os.utime(src)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp, dst_file)
+        except PermissionError:
+            # Windows does not replace a read-only file
+            os.chmod(dst_file, 0o644)
+            os.replace(tmp, dst_file)
+        return True
+
+    def store(self, checksum, src_file):
+        """add a downloaded file to the cache and evict the least recently used files"""
+        dst = self.path(checksum)
+        if os.path.exists(dst):
+            return
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # a copy, a link would make src_file read-only as well
+        shutil.copyfile(src_file, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, dst)
+        self.evict()
+
+    def evict(self):
+        """remove the least recently used files until the cache fits in max_bytes"""
+        entries = []
+        for root, dirs, files in os.walk(self._files):
+            for file in files:
+                # another writer's file, not in the cache until it is renamed into place
+                if file.endswith('.tmp'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, file))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, os.path.join(root, file)))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                # files linked out of the cache stay writable once it lets go of them
+                os.chmod(path, 0o644)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # still open in another process on Windows, evicted later
+                continue
+            total -= size
+
+    def _place(self, src, dst):
+        if self.link:
+            try:
+                return os.link(src, dst)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+
+
+# access token that was not supplied and not read from the configuration file yet
+_UNREAD = object()
+
+
+class BearerAuth(object):
+    """Bearer Authentication
+
+    token is the access token or a function returning it, called when
+    the first request is authenticated.
+    """
 
     def __init__(self, token):
         self.token = token
 
     def __call__(self, r):
-        r.headers["authorization"] = "Bearer " + self.token
+        token = self.token() if callable(self.token) else self.token
+        r.headers["authorization"] = "Bearer " + token
         return r
 
 
@@ -107,8 +1574,35 @@ class Client(object):
         ```
     """
 
-    def __init__(self, title=None, bucket=None, deposition_id=None, sandbox=None, token=None):
-        """initialization method"""
+    def __init__(self, title=None, bucket=None, deposition_id=None, sandbox=None, token=None,
+                 session=None, pool_connections=10, pool_maxsize=10, keep_alive=True, adapter=None,
+                 retry=None, rate_limiter=None, cache_ttl=30, record_cache=None, file_cache=None, hooks=None,
+                 bandwidth=None):
+        """initialization method
+
+        Args:
+            session (requests.Session): session to reuse for every request (optional).
+                If not supplied a pooled session is created and owned by the client.
+            pool_connections (int): number of per-host connection pools to cache
+            pool_maxsize (int): maximum number of connections kept per host
+            keep_alive (bool): reuse connections between requests
+            adapter (requests.adapters.BaseAdapter): custom transport adapter (optional)
+            retry (RetryPolicy): retry policy applied to every request,
+                defaults to RetryPolicy()
+            rate_limiter (RateLimiter): paces requests, defaults to RateLimiter()
+                with the Zenodo limits. Pass False to disable pacing.
+            cache_ttl (float): seconds deposition metadata is reused before
+                it is revalidated with the server
+            record_cache (RecordCache): persistent cache of published records
+                looked up by DOI (optional)
+            file_cache (FileCache): content-addressed cache of downloaded
+                files, keyed by their checksum (optional)
+            hooks (list): callables called with a RequestEvent after every
+                HTTP request, e.g. RequestStats or SpanHook (optional)
+            bandwidth (float or BandwidthLimiter): cap in bytes/s on the
+                uploads and downloads of the client, pass a BandwidthLimiter
+                to share the cap with other clients. 0 means no cap (optional)
+        """
         if sandbox:
             self._endpoint = "https://sandbox.zenodo.org/api"
         else:
@@ -118,20 +1612,156 @@ class Client(object):
         self.bucket = bucket
         self.deposition_id = deposition_id
         self.sandbox = sandbox
-        self._token = self._read_from_config if token is None else token
-        self._bearer_auth = BearerAuth(self._token)
+        # read from ~/.zenodo_token by the first authenticated request when not supplied
+        self._access_token = _UNREAD if token is None else token
+        self._bearer_auth = BearerAuth(lambda: self._token)
         # 'metadata/prereservation_doi/doi'
 
+        # the session, and with it requests, is created by the first request
+        self._owns_session = session is None
+        self._pooled_session = session
+        self._session_options = dict(pool_connections=pool_connections,
+                                     pool_maxsize=pool_maxsize,
+                                     keep_alive=keep_alive,
+                                     adapter=adapter)
+        self._session_lock = threading.Lock()
+        self._retry = RetryPolicy() if retry is None else retry
+        self._rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        self._cache_ttl = cache_ttl
+        self._deposition_cache = {}
+        self._record_cache = record_cache
+        self._file_cache = file_cache
+        self._hooks = list(hooks or [])
+        if isinstance(bandwidth, (int, float)):
+            bandwidth = BandwidthLimiter(bandwidth) if bandwidth else None
+        self._bandwidth = bandwidth
+
     def __repr__(self):
         return f"zenodoapi('{self.title}','{self.bucket}','{self.deposition_id}')"
 
     def __str__(self):
         return f"{self.title} --- {self.deposition_id}"
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """close the pooled connections held by the client
+
+        A session supplied by the caller is left open.
+        """
+        if self._owns_session and self._pooled_session is not None:
+            self._pooled_session.close()
+
     # ---------------------------------------------
     # hidden functions
     # ---------------------------------------------
 
+    @property
+    def _token(self):
+        """the access token, read from the configuration file on first use if not supplied"""
+        # only looked up once, the configuration file may not have a token
+        if self._access_token is _UNREAD:
+            self._access_token = self._read_from_config
+        return self._access_token
+
+    @property
+    def _session(self):
+        """the pooled session, created on first use"""
+        if self._pooled_session is None:
+            with self._session_lock:
+                if self._pooled_session is None:
+                    self._pooled_session = make_session(**self._session_options)
+        return self._pooled_session
+
+    def _request(self, method, url, **kwargs):
+        """send a request through the client's pooled session
+
+        Requests are paced by the rate limiter and retried according to
+        the retry policy on connection errors and retryable statuses.
+        A POST is only retried when the server certainly did not act on
+        it, see RetryPolicy.should_retry. A file body is rewound before it
+        is sent again, a body that can only be read once (e.g. a
+        generator) is never retried.
+
+        Args:
+            method (str): HTTP method
+            url (str): URL to request
+            **kwargs: passed on to requests.Session.request
+
+        Returns:
+            requests.Response: the last response
+        """
+        data: Any = kwargs.get('data')
+        rewind = data.tell() if hasattr(data, 'seek') and hasattr(data, 'tell') else None
+        replayable = data is None or rewind is not None or isinstance(data, (bytes, str, dict, list, tuple, FileBody))
+        sent = None
+        if self._hooks and not replayable and not hasattr(data, '__len__'):
+            sent = [0]
+            kwargs['data'] = data = _count_bytes(data, sent)
+
+        attempt = 0
+        r = None
+        start, started = time.time(), time.monotonic()
+        try:
+            while True:
+                if rewind is not None:
+                    data.seek(rewind)
+                if self._rate_limiter:
+                    self._rate_limiter.acquire()
+                # a failed attempt leaves no response behind
+                r = None
+                try:
+                    r = self._session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if not replayable or not self._retry.should_retry(attempt, method=method, sent=not _unsent(e)):
+                        raise
+                    time.sleep(self._retry.delay(attempt))
+                else:
+                    if self._rate_limiter:
+                        self._rate_limiter.update(r.headers)
+                    if r.ok or not replayable or not self._retry.should_retry(attempt, r.status_code, method):
+                        return r
+                    r.close()
+                    time.sleep(self._retry.delay(attempt, r.headers))
+                attempt += 1
+        except Exception as e:
+            r = None
+            if self._hooks:
+                self._emit(RequestEvent(method, url, endpoint_template(url), retries=attempt, start=start,
+                                        duration=time.monotonic() - started, error=e))
+            raise
+        finally:
+            if self._hooks and r is not None:
+                if sent is None and r.request is not None and r.request.headers.get('Content-Length'):
+                    sent = [int(r.request.headers['Content-Length'])]
+                received = r.headers.get('Content-Length')
+                if received is None and not kwargs.get('stream'):
+                    received = len(r.content)
+                self._emit(RequestEvent(method, url, endpoint_template(url), status=r.status_code,
+                                        bytes_sent=sent[0] if sent else None,
+                                        bytes_received=None if received is None else int(received),
+                                        retries=attempt, start=start, duration=time.monotonic() - started))
+
+    def _emit(self, event):
+        """pass event to every request hook, a failing hook only raises a warning"""
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                warnings.warn(f"request hook {hook!r} failed: {e!r}")
+
+    def add_hook(self, hook):
+        """call hook(event) with a RequestEvent after every HTTP request
+
+        Args:
+            hook (callable): e.g. a RequestStats or SpanHook
+        """
+        self._hooks.append(hook)
+
     @staticmethod
     def _get_upload_types():
         """Acceptable upload types
@@ -200,17 +1830,33 @@ class Client(object):
         else:
             print(' ** No token was found, check your ~/.zenodo_token file ** ')
 
-    def _get_depositions(self):
+    def _get_depositions(self, page=None, size=None, query=None, status=None):
         """gets the current project deposition
 
         this provides details on the project, including metadata
 
+        Args:
+            page (int): page of results to return (optional)
+            size (int): number of depositions per page (optional)
+            query (str): search query (optional)
+            status (str): either 'draft' or 'published' (optional)
+
         Returns:
             dict: dictionary containing project details
         """
+        params = {}
+        if page is not None:
+            params['page'] = page
+        if size is not None:
+            params['size'] = size
+        if query is not None:
+            params['q'] = query
+        if status is not None:
+            params['status'] = status
+
         # get request, returns our response
-        r = requests.get(f"{self._endpoint}/deposit/depositions",
-                         auth=self._bearer_auth)
+        r = self._request("GET", f"{self._endpoint}/deposit/depositions",
+                          params=params, auth=self._bearer_auth)
         if r.ok:
             return r.json()
         else:
@@ -227,17 +1873,69 @@ class Client(object):
         Returns:
             dict: dictionary containing project details
         """
-        # get request, returns our response
-        if self.deposition_id is not None:
-            r = requests.get(f"{self._endpoint}/deposit/depositions/{self.deposition_id}",
-                         auth=self._bearer_auth)
-        else:
+        if self.deposition_id is None:
             print(' ** no deposition id is set on the project ** ')
             return None
-        if r.ok:
-            return r.json()
-        else:
+        return self._get_deposition(self.deposition_id)
+
+    def _get_deposition(self, dep_id, refresh=False):
+        """gets a deposition through the client's metadata cache
+
+        A cached deposition younger than the cache TTL is returned without
+        a request. An older one is revalidated with If-None-Match, so an
+        unchanged deposition costs a 304 response without a body. The
+        cached dict is shared, do not modify it.
+
+        Args:
+            dep_id (str): project deposition ID
+            refresh (bool): ignore the TTL and revalidate
+
+        Returns:
+            dict: dictionary containing project details
+        """
+        key = str(dep_id)
+        entry = self._deposition_cache.get(key)
+        if entry is not None and not refresh and time.monotonic() - entry['time'] < self._cache_ttl:
+            return entry['data']
+
+        headers = {'If-None-Match': entry['etag']} if entry is not None and entry['etag'] else {}
+        r = self._request("GET", f"{self._endpoint}/deposit/depositions/{dep_id}",
+                          headers=headers, auth=self._bearer_auth)
+        if r.status_code == 304 and entry is not None:
+            entry['time'] = time.monotonic()
+            return entry['data']
+        if not r.ok:
             return r.raise_for_status()
+        return self._cache_deposition(r, dep_id)
+
+    def _cache_deposition(self, r, dep_id):
+        """store a deposition returned by the API in the metadata cache
+
+        Args:
+            r (requests.Response): response whose body is a deposition
+            dep_id (str): project deposition ID
+
+        Returns:
+            dict: the deposition
+        """
+        data = r.json()
+        self._deposition_cache[str(dep_id)] = {
+            'data': data,
+            'etag': r.headers.get('ETag'),
+            'time': time.monotonic(),
+        }
+        return data
+
+    def invalidate_cache(self, dep_id=None):
+        """drop cached deposition metadata
+
+        Args:
+            dep_id (str): deposition to drop, every deposition if None
+        """
+        if dep_id is None:
+            self._deposition_cache.clear()
+        else:
+            self._deposition_cache.pop(str(dep_id), None)
 
     def _get_depositions_files(self):
         """gets the file deposition
@@ -249,7 +1947,7 @@ class Client(object):
         """
         # get request, returns our response
         if self.deposition_id is not None:
-            r = requests.get(f"{self._endpoint}/deposit/depositions/{self.deposition_id}/files",
+            r = self._request("GET", f"{self._endpoint}/deposit/depositions/{self.deposition_id}/files",
                          auth=self._bearer_auth)
         else:
             print(' ** no deposition id is set on the project ** ')
@@ -270,17 +1968,10 @@ class Client(object):
         Returns:
             str: the bucket URL to upload files to
         """
-        dic = self.list_projects
-        dep_id = dic[title] if dic is not None else None
-
-        # get request, returns our response, this the records metadata
-        r = requests.get(f"{self._endpoint}/deposit/depositions/{dep_id}",
-                         auth=self._bearer_auth)
-
-        if r.ok:
-            return r.json()['links']['bucket']
-        else:
-            return r.raise_for_status()
+        for dep in self.iter_depositions():
+            if dep.get('title') == title:
+                return self._get_deposition(dep['id'])['links']['bucket']
+        return None
 
     def _get_bucket_by_id(self, dep_id=None):
         """gets the bucket URL by project deposition ID
@@ -293,22 +1984,11 @@ class Client(object):
         Returns:
             str: the bucket URL to upload files to
         """
-        # get request, returns our response
-        if dep_id is not None:
-            r = requests.get(f"{self._endpoint}/deposit/depositions/{dep_id}",
-                             auth=self._bearer_auth)
-        else:
-            r = requests.get(f"{self._endpoint}/deposit/depositions/{self.deposition_id}",
-                         auth=self._bearer_auth)
-
-        if r.ok:
-            return r.json()['links']['bucket']
-        else:
-            return r.raise_for_status()
+        return self._get_deposition(self.deposition_id if dep_id is None else dep_id)['links']['bucket']
 
     def _get_api(self):
         # get request, returns our response
-        r = requests.get(f"{self._endpoint}", auth=self._bearer_auth)
+        r = self._request("GET", f"{self._endpoint}", auth=self._bearer_auth)
 
         if r.ok:
             return r.json()
@@ -353,23 +2033,123 @@ class Client(object):
 
         prints to the screen the "Project Name" and "ID"
         """
-        tmp = self._get_depositions()
+        print('Project Name ---- ID ---- Status ---- Latest Published ID')
+        print('---------------------------------------------------------')
+        for dep in self.iter_depositions(prefetch=True):
+            project = self._summarize_deposition(dep)
+            print(f"{project['title']} ---- {project['id']} ---- {project['status']} ---- {project['latest']}")
 
-        if isinstance(tmp, list):
-            print('Project Name ---- ID ---- Status ---- Latest Published ID')
-            print('---------------------------------------------------------')
-            for file in tmp:
-                status = {}  # just to rename the file outputs and deal with exceptions
-                if file['submitted']:
-                    status['submitted'] = 'published'
-                else:
-                    status['submitted'] = 'unpublished'
-                
-                status["latest"] = self._get_latest_record(file['id'])
-                    
-                print(f"{file['title']} ---- {file['id']} ---- {status['submitted']} ---- {status['latest']}")
-        else:
-            print(' ** need to setup ~/.zenodo_token file ** ')
+    def projects(self, page=None, size=None):
+        """structured listing of projects connected to the supplied ACCESS_KEY
+
+        Everything is derived from a single request to /deposit/depositions,
+        no follow-up request is made per project.
+
+        Args:
+            page (int): page of results to return (optional)
+            size (int): number of projects per page (optional)
+
+        Returns:
+            list: one dict per project with keys title, id, status,
+                latest, concept_id and bucket. None if the depositions
+                could not be listed.
+        """
+        depositions = self._get_depositions(page=page, size=size)
+        if not isinstance(depositions, list):
+            return None
+        return [self._summarize_deposition(dep) for dep in depositions]
+
+    def iter_depositions(self, page_size=100, query=None, status=None, prefetch=False):
+        """lazily iterate over every deposition of the account
+
+        Pages are requested on demand, so stopping early skips the
+        remaining pages. The server may return fewer depositions per page
+        than requested, so the next page is found through the Link header
+        of the response, or, when there is none, by reading pages until an
+        empty one.
+
+        Args:
+            page_size (int): number of depositions requested per page
+            query (str): search query (optional)
+            status (str): either 'draft' or 'published' (optional)
+            prefetch (bool): fetch the next page in the background while
+                the current one is consumed
+
+        Yields:
+            dict: deposition as returned by the API
+        """
+        params = {'size': page_size}
+        if query is not None:
+            params['q'] = query
+        if status is not None:
+            params['status'] = status
+
+        def fetch(page):
+            r = self._request("GET", f"{self._endpoint}/deposit/depositions",
+                              params={'page': page, **params}, auth=self._bearer_auth)
+            r.raise_for_status()
+            items = r.json()
+            return items, ('next' in r.links) if r.links else bool(items)
+
+        return _paginate(fetch, prefetch)
+
+    def iter_records(self, page_size=100, query=None, prefetch=False):
+        """lazily iterate over published records matching a search query
+
+        The next page is found through the ``links.next`` of each response,
+        or, when it is missing, by comparing the records read so far with
+        ``hits.total``. The token is sent when one is configured, so
+        restricted records the account may see are listed too.
+
+        Args:
+            page_size (int): number of records requested per page
+            query (str): search query (optional)
+            prefetch (bool): fetch the next page in the background while
+                the current one is consumed
+
+        Yields:
+            dict: record as returned by the API
+        """
+        params = {'size': page_size}
+        if query is not None:
+            params['q'] = query
+        auth = self._bearer_auth if self._token else None
+        seen = []
+
+        def fetch(page):
+            r = self._request("GET", f"{self._endpoint}/records",
+                              params={'page': page, **params}, auth=auth)
+            r.raise_for_status()
+            data = r.json()
+            items = data['hits']['hits']
+            if 'links' in data:
+                return items, 'next' in data['links']
+            # pages are fetched in order, even when prefetched
+            seen.append(len(items))
+            return items, sum(seen) < data['hits'].get('total', 0)
+
+        return _paginate(fetch, prefetch)
+
+    @staticmethod
+    def _summarize_deposition(dep):
+        """summarize a deposition returned by the API
+
+        Args:
+            dep (dict): deposition as returned by /deposit/depositions
+
+        Returns:
+            dict: title, id, status, latest, concept_id and bucket of the deposition
+        """
+        links = dep.get('links', {})
+        latest = links.get('latest')
+        return {
+            'title': dep.get('title', dep.get('metadata', {}).get('title')),
+            'id': dep['id'],
+            'status': 'published' if dep.get('submitted') else 'unpublished',
+            'latest': latest.split('/')[-1] if latest else 'None',
+            'concept_id': dep.get('conceptrecid'),
+            'bucket': links.get('bucket'),
+        }
 
     @property
     def list_files(self):
@@ -406,7 +2186,8 @@ class Client(object):
         """
 
         # get request, returns our response
-        r = requests.post(
+        r = self._request(
+            "POST",
             f"{self._endpoint}/deposit/depositions",
             auth=self._bearer_auth,
             data=json.dumps({}),
@@ -427,23 +2208,21 @@ class Client(object):
 
     def set_project(self, dep_id=None):
         '''set the project by id'''
-        projects = self._get_depositions()
-
-        if projects is not None:
-            project_list = [
-                d
-                for d in projects
-                if self._check_parent_doi(dep_id=dep_id, project_obj=d)
-            ]
-            if len(project_list) > 0:
-                self.title = project_list[0]["title"]
-                self.bucket = self._get_bucket_by_id(project_list[0]["id"])
-                self.deposition_id = project_list[0]["id"]
+        project = next(
+            (d for d in self.iter_depositions()
+             if self._check_parent_doi(dep_id=dep_id, project_obj=d)),
+            None,
+        )
 
+        if project is not None:
+            self.title = project["title"]
+            self.bucket = project.get("links", {}).get("bucket") or self._get_bucket_by_id(project["id"])
+            self.deposition_id = project["id"]
         else:
             print(f' ** Deposition ID: {dep_id} does not exist in your projects  ** ')
 
-    def _check_parent_doi(self, dep_id, project_obj):
+    @staticmethod
+    def _check_parent_doi(dep_id, project_obj):
         if project_obj["id"] == int(dep_id):
             return True
         concept_doi = project_obj.get("conceptdoi", None)
@@ -474,7 +2253,8 @@ class Client(object):
         "metadata": metadata.__dict__
         }
 
-        r = requests.put(
+        r = self._request(
+            "PUT",
             f"{self._endpoint}/deposit/depositions/{self.deposition_id}",
             auth=self._bearer_auth,
             data=json.dumps(data),
@@ -482,16 +2262,31 @@ class Client(object):
         )
 
         if r.ok:
-            return r.json()
+            return self._cache_deposition(r, self.deposition_id)
         else:
+            self.invalidate_cache(self.deposition_id)
             return r.raise_for_status()
 
-    def upload_file(self, file_path=None, publish=False):
+    def upload_file(self, file_path=None, publish=False, chunk_size=UPLOAD_CHUNK_SIZE, algorithms=('md5',),
+                    progress=None):
         """upload a file to a project
 
+        The checksums are computed while the file is sent and the one
+        reported by Zenodo is compared with it, the file is not read again.
+        The digests are available from the returned response as
+        r.request.body.hexdigest(algorithm).
+
         Args:
             file_path (str): name of the file to upload
             publish (bool): whether implemente publish action or not
+            chunk_size (int): number of bytes handed to the socket at a time
+            algorithms (tuple): hashlib algorithms computed during the upload,
+                e.g. ('md5', 'sha256')
+            progress (callable): called as progress(bytes_sent, total_bytes)
+                after every chunk, e.g. a ProgressReporter (optional)
+
+        Raises:
+            IOError: the checksum reported by Zenodo does not match the file
         """
         if file_path is None:
             print("You need to supply a path")
@@ -503,21 +2298,240 @@ class Client(object):
             print("You need to create a project with zeno.create_project() "
                   "or set a project zeno.set_project() before uploading a file") 
         else:
-            bucket_link = self.bucket
+            r = self._put_file(file_path, chunk_size=chunk_size, algorithms=algorithms, progress=progress)
 
-            with open(file_path, "rb") as fp:
-                # text after last '/' is the filename
-                filename = file_path.split('/')[-1]
-                r = requests.put(f"{bucket_link}/{filename}",
-                                 auth=self._bearer_auth,
-                                 data=fp,)
+            print(f"{file_path} successfully uploaded!") if r.ok else print("Oh no! something went wrong")
 
-                print(f"{file_path} successfully uploaded!") if r.ok else print("Oh no! something went wrong")
-            
             if publish:
                 return self.publish()
+            return r
+
+    def _put_file(self, file_path, filename=None, chunk_size=UPLOAD_CHUNK_SIZE, algorithms=('md5',),
+                  progress=None):
+        """PUT a local file into the project bucket
+
+        Args:
+            file_path (str): path of the file to upload
+            filename (str): name of the file in the bucket, defaults to
+                the text after the last '/' of file_path
+            chunk_size (int): number of bytes handed to the socket at a time
+            algorithms (tuple): hashlib algorithms computed while the file is sent
+            progress (callable): called as progress(bytes_sent, total_bytes) (optional)
+
+        Returns:
+            requests.Response: the response of the bucket
+
+        Raises:
+            IOError: the checksum in the response does not match the file sent
+        """
+        if filename is None:
+            filename = file_path.split('/')[-1]
+        body = FileBody(os.path.expanduser(file_path), chunk_size, algorithms, progress, self._bandwidth)
+        r = self._request("PUT", f"{self.bucket}/{filename}",
+                          auth=self._bearer_auth,
+                          data=body,)
+        self.invalidate_cache(self.deposition_id)
+        if r.ok:
+            self._verify_upload(r, body, filename)
+        return r
+
+    @staticmethod
+    def _verify_upload(r, body, filename):
+        """compare the checksum reported for an upload with the one computed while sending it"""
+        try:
+            checksum = r.json().get('checksum')
+        except ValueError:
+            checksum = None
+        if not checksum:
+            return
+        algorithm, digest = parse_checksum(checksum)
+        if algorithm in body.algorithms and body.hexdigest(algorithm) != digest:
+            raise IOError(f"{filename} was corrupted during the upload, "
+                          f"Zenodo reports {algorithm} {digest}, sent {body.hexdigest(algorithm)}")
+
+    def _put_stream(self, filename, body, publish=False):
+        """upload an iterable of bytes as filename in the project bucket
+
+        Args:
+            filename (str): name of the file in the bucket
+            body (iterable): the file content, a SizedStream is sent with
+                a Content-Length header, anything else is sent chunked
+            publish (bool): whether implemente publish action or not
+        """
+        if self.bucket is None:
+            print("You need to create a project with zeno.create_project() "
+                  "or set a project zeno.set_project() before uploading a file")
+            return
+
+        if self._bandwidth is not None:
+            if isinstance(body, SizedStream):
+                body = SizedStream(_throttle(body, self._bandwidth), len(body))
+            else:
+                body = _throttle(body, self._bandwidth)
+        r = self._request("PUT", f"{self.bucket}/{filename}",
+                          auth=self._bearer_auth,
+                          data=body,)
+        self.invalidate_cache(self.deposition_id)
+
+        print(f"{filename} successfully uploaded!") if r.ok else print("Oh no! something went wrong")
+
+        if publish:
+            return self.publish()
+        return r
+
+    def upload_many(self, paths, max_workers=4, retries=3, publish=False, progress=None):
+        """upload many files to a project concurrently, smallest files first
+
+        Args:
+            paths (list): paths of the files to upload
+            max_workers (int): maximum number of files uploaded at once
+            retries (int): number of times a file is uploaded again after a checksum
+                mismatch, failed requests are retried by the client's retry policy
+            publish (bool): publish the project once every file is uploaded
+            progress (callable): called as progress(bytes_done, total_bytes) for
+                the whole batch, from the worker threads, e.g. a ProgressReporter (optional)
+
+        Returns:
+            dict: report with per file results under 'files' (filename, bytes,
+                seconds and error), the number of 'failed' files, total
+                'bytes', wall-clock 'seconds', 'throughput' in bytes/s and
+                whether the project was 'published'
+        """
+        if self.bucket is None:
+            raise ValueError("You need to create a project with zeno.create_project() "
+                             "or set a project zeno.set_project() before uploading files")
+
+        paths = [os.path.expanduser(str(path)) for path in paths]
+        _check_unique_names(paths)
+        for path in paths:
+            if not Path(path).is_file():
+                raise FileNotFoundError(f"{path} does not exist")
+
+        total = sum(os.path.getsize(path) for path in paths)
+        done = {}
+        lock = threading.Lock()
+
+        def track(filename):
+            def callback(sent, _):
+                with lock:
+                    done[filename] = sent
+                    progress(sum(done.values()), total)
+            return callback if progress is not None else None
+
+        def put(path):
+            filename = os.path.basename(path)
+
+            def upload():
+                self._put_file(path, filename, progress=track(filename)).raise_for_status()
+                return os.path.getsize(path)
+            return _transfer_file(filename, upload, retries, _mismatch)
+
+        start = time.monotonic()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = _smallest_first(executor, put, paths, [os.path.getsize(path) for path in paths])
+        report = transfer_report(results, time.monotonic() - start)
+
+        report['published'] = False
+        if publish and report['failed'] == 0:
+            self.publish()
+            report['published'] = True
+        return report
+
+    def upload_dir(self, source_dir=None, mode="files", output_file=None, max_workers=4, retries=3, publish=False):
+        """upload the content of a directory to a project
+
+        Args:
+            source_dir (str): path to the directory
+            mode (str): "files" uploads every file of the directory tree
+                concurrently (file names must be unique), "sync" does the same
+                but skips unchanged files and deletes files no longer present
+                (see sync), "zip" and "tar" upload the directory as a single archive
+            output_file (str): name of the archive for "zip" and "tar" modes (optional)
+            max_workers (int): maximum number of files uploaded at once in "files" mode
+            retries (int): number of times each file is retried in "files" mode
+            publish (bool): publish the project once the upload succeeded
+
+        Returns:
+            dict: the report of upload_many or sync, None for archives
+        """
+        source_dir = os.path.expanduser(source_dir)
+        if not Path(source_dir).is_dir():
+            raise FileNotFoundError(f"{source_dir} does not exist")
+
+        if mode == "zip":
+            return self.upload_zip(source_dir, output_file, publish=publish)
+        if mode == "tar":
+            return self.upload_tar(source_dir, output_file, publish=publish)
+        if mode == "sync":
+            return self.sync(source_dir, max_workers=max_workers, retries=retries, publish=publish)
+        if mode != "files":
+            raise ValueError(f"mode must be one of ['files', 'sync', 'zip', 'tar'], got {mode}")
+
+        return self.upload_many(_walk_files(source_dir), max_workers=max_workers, retries=retries, publish=publish)
+
+    def sync(self, source, max_workers=4, retries=3, delete=True, publish=False):
+        """make the project files match local files, uploading only what changed
+
+        The MD5 of every local file is compared with the checksum of the
+        project file of the same name. Only new and changed files are
+        uploaded, project files without a local counterpart are deleted.
+
+        Args:
+            source (str or list): directory whose files (whole tree) are
+                synced, or a list of file paths. File names must be unique.
+            max_workers (int): maximum number of files hashed or uploaded at once
+            retries (int): number of times each upload is retried
+            delete (bool): delete project files that are not in source
+            publish (bool): publish the project once every file is uploaded
 
-    def upload_zip(self, source_dir=None, output_file=None, publish=False):
+        Returns:
+            dict: the report of upload_many with the names of the
+                unchanged files under 'skipped' and of the deleted files
+                under 'deleted'. Files that could not be deleted are
+                reported under 'files' with their error and counted as failed
+        """
+        if isinstance(source, (str, Path)):
+            source = os.path.expanduser(str(source))
+            if not Path(source).is_dir():
+                raise FileNotFoundError(f"{source} does not exist")
+            paths = _walk_files(source)
+        else:
+            paths = [os.path.expanduser(str(path)) for path in source]
+        # before anything is hashed or deleted
+        _check_unique_names(paths)
+
+        remote = {f['filename']: f for f in self._get_deposition(self.deposition_id, refresh=True).get('files', [])}
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            digests = list(executor.map(lambda path: file_checksum(path).hexdigest(), paths))
+
+        changed, skipped = [], []
+        for path, digest in zip(paths, digests):
+            name = os.path.basename(path)
+            if name in remote and parse_checksum(remote[name]['checksum'])[1] == digest:
+                skipped.append(name)
+            else:
+                changed.append(path)
+
+        deleted, undeleted = [], []
+        for name in sorted(set(remote) - {os.path.basename(path) for path in paths}) if delete else []:
+            start = time.monotonic()
+            try:
+                self.delete_file(name).raise_for_status()
+                deleted.append(name)
+            except requests.exceptions.HTTPError as e:
+                undeleted.append({'filename': name, 'bytes': 0, 'seconds': time.monotonic() - start, 'error': e})
+
+        # a project still holding files that should be gone is not published
+        report = self.upload_many(changed, max_workers=max_workers, retries=retries,
+                                  publish=publish and not undeleted)
+        report['files'] += undeleted
+        report['failed'] += len(undeleted)
+        report['skipped'] = skipped
+        report['deleted'] = deleted
+        return report
+
+    def upload_zip(self, source_dir=None, output_file=None, publish=False, stream=False, store=False,
+                   compresslevel=None, workers=1):
         """upload a directory to a project as zip
 
         This will: 
@@ -525,12 +2539,26 @@ class Client(object):
             2. upload the zip directory to your project
             3. remove the zip file from your local machine
 
+        With stream=True the archive is built on the fly and sent as the
+        request body, nothing is written to disk. A stored (uncompressed)
+        archive is sent with a precomputed Content-Length, a compressed one
+        with chunked transfer encoding.
+
         Args:
             source_dir (str): path to directory to tar
             output_file (str): name of output file (optional)
                 defaults to using the source_dir name as output_file
             publish (bool): whether implemente publish action or not, argument for `upload_file`
+            stream (bool): stream the archive instead of writing it to disk first
+            store (bool): store the files without compression
+            compresslevel (int): deflate compression level, 0 to 9 (optional)
+            workers (int): with workers > 1, files are deflated on a thread pool
+                and already compressed formats (STORED_EXTENSIONS) are stored
         """
+        compression = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+        parallel = workers > 1 and not store
+        level = 6 if compresslevel is None else compresslevel
+
         # make sure source directory exists
         source_dir = os.path.expanduser(source_dir)
         source_obj = Path(source_dir)
@@ -556,26 +2584,40 @@ class Client(object):
                 output_file = os.path.expanduser(output_file + '.zip')
                 output_obj = Path(output_file)
 
+        # send the archive as it is built, nothing is written to disk
+        if stream:
+            if parallel:
+                body = iter_parallel_zipfile(source_dir, compresslevel=level, workers=workers)
+            else:
+                body = iter_zipfile(source_dir, compression)
+            if store:
+                body = SizedStream(body, zip_stored_size(source_dir))
+            return self._put_stream(output_obj.name, body, publish=publish)
+
         # check to make sure outputfile doesn't already exist
         if output_obj.exists():
             raise Exception(f"{output_obj} already exists. Please chance the name")
 
         # create tar directory if does not exist
-        if output_obj.parent.exists():
-            with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                make_zipfile(source_dir, zipf)
-        else:
+        if not output_obj.parent.exists():
             os.makedirs(output_obj.parent)
-            with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        if parallel:
+            with open(output_file, 'wb') as f:
+                for chunk in iter_parallel_zipfile(source_dir, compresslevel=level, workers=workers):
+                    f.write(chunk)
+        else:
+            with zipfile.ZipFile(output_file, 'w', compression, compresslevel=compresslevel) as zipf:
                 make_zipfile(source_dir, zipf)
 
         # upload the file
-        self.upload_file(file_path=output_file, publish=publish)
+        r = self.upload_file(file_path=output_file, publish=publish)
 
         # remove tar file after uploading it
         os.remove(output_file)
+        return r
 
-    def upload_tar(self, source_dir=None, output_file=None, publish=False):
+    def upload_tar(self, source_dir=None, output_file=None, publish=False, stream=False,
+                   compresslevel=9, workers=1):
         """upload a directory to a project
 
         This will: 
@@ -583,11 +2625,17 @@ class Client(object):
             2. upload the tarred directory to your project
             3. remove the tar file from your local machine
 
+        With stream=True the archive is built on the fly and sent as the
+        request body with chunked transfer encoding, nothing is written to disk.
+
         Args:
             source_dir (str): path to directory to tar
             output_file (str): name of output file (optional)
                 defaults to using the source_dir name as output_file
             publish (bool): whether implemente publish action or not, argument for `upload_file`
+            stream (bool): stream the archive instead of writing it to disk first
+            compresslevel (int): gzip compression level, 0 to 9
+            workers (int): number of threads compressing blocks of the tar stream
         """
         # output_file = './tmp/tarTest.tar.gz'
         # source_dir = '/Users/gloege/test'
@@ -617,24 +2665,30 @@ class Client(object):
                 output_file = os.path.expanduser(output_file + '.tar.gz')
                 output_obj = Path(output_file)
 
+        # send the archive as it is built, nothing is written to disk
+        if stream:
+            body = iter_tarfile(source_dir, compresslevel=compresslevel, workers=workers)
+            return self._put_stream(output_obj.name, body, publish=publish)
+
         # check to make sure outputfile doesn't already exist
         if output_obj.exists():
             raise Exception(f"{output_obj} already exists. Please chance the name")
 
         # create tar directory if does not exist
-        if output_obj.parent.exists():
-            make_tarfile(output_file=output_file, source_dir=source_dir)
-        else:
+        if not output_obj.parent.exists():
             os.makedirs(output_obj.parent)
-            make_tarfile(output_file=output_file, source_dir=source_dir)
+        make_tarfile(output_file=output_file, source_dir=source_dir,
+                     compresslevel=compresslevel, workers=workers)
 
         # upload the file
-        self.upload_file(file_path=output_file, publish=publish)
+        r = self.upload_file(file_path=output_file, publish=publish)
 
         # remove tar file after uploading it
         os.remove(output_file)
+        return r
 
-    def update(self, metadata:ZenodoMetadata, source=None, output_file=None, publish=False):
+    def update(self, metadata:ZenodoMetadata, source=None, output_file=None, publish=False, stream=False,
+               workers=1, ready_timeout=60, sync=False):
         """update an existed record
 
         Args:
@@ -642,54 +2696,210 @@ class Client(object):
             output_file (str): name of output file (optional)
                 defaults to using the source_dir name as output_file
             publish (bool): whether implemente publish action or not, argument for `upload_file`
+            stream (bool): stream directory archives instead of writing them to disk first
+            workers (int): number of threads compressing directory archives
+            ready_timeout (float): seconds to wait for the new version to be ready
+            sync (bool): upload only the files that changed since the previous
+                version and delete the ones no longer in source (see sync)
+
+        Returns:
+            the result of the upload: the response of the upload or of
+            publish, or the report of sync
         """
+        self._new_version(ready_timeout=ready_timeout)
+        self.change_metadata(metadata=metadata)
+        # invoke upload funcions
+        return self._upload_source(source, output_file, publish=publish, stream=stream, workers=workers, sync=sync)
+
+    def _new_version(self, ready_timeout=60):
+        """create a new version draft of the project and point the client to it"""
         # create a draft deposition
         url_action = self._get_depositions_by_id()['links']['newversion']
-        r = requests.post(url_action, auth=self._bearer_auth)
+        r = self._request("POST", url_action, auth=self._bearer_auth)
+        self.invalidate_cache(self.deposition_id)
         r.raise_for_status()
 
         # parse current project to the draft deposition
         new_dep_id = r.json()['links']['latest_draft'].split('/')[-1]
-        
-        # adding this to let new id propogate in the backend 
-        time.sleep(2)
-        
-        self.set_project(new_dep_id)
 
-        time.sleep(5)
+        # wait for the new id to propagate in the backend
+        draft = self._wait_for_draft(new_dep_id, timeout=ready_timeout)
+        self.title = draft.get('title', draft.get('metadata', {}).get('title'))
+        self.bucket = draft['links']['bucket']
+        self.deposition_id = draft['id']
 
-        self.change_metadata(metadata=metadata)
-        # invoke upload funcions
+    def _upload_source(self, source, output_file=None, publish=False, stream=False, workers=1, sync=False,
+                       archive_dir=None):
+        """upload a file or directory the way update does
+
+        A directory archive that is not streamed is written to archive_dir
+        when given, instead of the working directory.
+        """
         if not source:
             print("You need to supply a path")
-        
+
         if Path(source).exists():
-            if Path(source).is_file():
-                self.upload_file(source, publish=publish)
+            if sync:
+                return self.sync(source if Path(source).is_dir() else [source],
+                                 max_workers=max(workers, 4), publish=publish)
+            elif Path(source).is_file():
+                return self.upload_file(source, publish=publish)
             elif Path(source).is_dir():
+                if archive_dir is not None and not stream:
+                    output_file = os.path.join(archive_dir, os.path.basename(output_file or f"{Path(source).stem}.zip"))
                 if not output_file:
-                    self.upload_zip(source, publish=publish)
+                    return self.upload_zip(source, publish=publish, stream=stream, workers=workers)
                 elif '.zip' in ''.join(Path(output_file).suffixes).lower():
-                    self.upload_zip(source, output_file, publish=publish)
+                    return self.upload_zip(source, output_file, publish=publish, stream=stream, workers=workers)
                 elif '.tar.gz' in ''.join(Path(output_file).suffixes).lower():
-                    self.upload_tar(source, output_file, publish=publish)
+                    return self.upload_tar(source, output_file, publish=publish, stream=stream, workers=workers)
         else:
             raise FileNotFoundError(f"{source} does not exist")
-        
+
+    def update_many(self, jobs, max_workers=8, max_uploads=4, publish=False, stream=False,
+                    workers=1, ready_timeout=60, sync=False):
+        """run update on many depositions concurrently
+
+        Every job goes through the update flow (new version, metadata,
+        upload, publish) on its own client sharing this client's session,
+        rate limiter and caches. Up to max_workers jobs run at once, at most
+        max_uploads of them in the upload stage, so the drafts of the next
+        jobs are prepared while earlier jobs are uploading. A failed job is
+        reported and does not stop the others.
+
+        Args:
+            jobs (list): (deposition_id, metadata, source) tuples, optionally
+                with an output_file fourth item, or dicts with these keys
+            max_workers (int): maximum number of jobs running at once
+            max_uploads (int): maximum number of jobs uploading at once
+            publish (bool): publish every new version once its upload succeeded
+            stream (bool): stream directory archives instead of writing them to disk first
+            workers (int): number of threads compressing each directory archive
+            ready_timeout (float): seconds to wait for each new version to be ready
+            sync (bool): upload only the files that changed since the previous version
+
+        Returns:
+            dict: report with per job results under 'jobs' (deposition_id,
+                new_deposition_id, the last 'stage' reached, published,
+                error and seconds), the number of 'failed' jobs and the
+                wall-clock 'seconds'
+        """
+        keys = ('deposition_id', 'metadata', 'source', 'output_file')
+        jobs = [dict(job) if isinstance(job, dict) else dict(zip(keys, job)) for job in jobs]
+        uploads = threading.Semaphore(max_uploads or max_workers)
+
+        def run(job):
+            start = time.monotonic()
+            result = {'deposition_id': job['deposition_id'], 'new_deposition_id': None,
+                      'stage': 'newversion', 'published': False, 'error': None, 'seconds': 0.0}
+            client = self._fork(job['deposition_id'])
+            try:
+                client._new_version(ready_timeout=ready_timeout)
+                result['new_deposition_id'] = client.deposition_id
+                result['stage'] = 'metadata'
+                client.change_metadata(metadata=job['metadata'])
+                result['stage'] = 'upload'
+                # each job writes its archive to its own directory, sources may share a name
+                with uploads, tempfile.TemporaryDirectory() as archive_dir:
+                    uploaded = client._upload_source(job['source'], job.get('output_file'), stream=stream,
+                                                     workers=workers, sync=sync, archive_dir=archive_dir)
+                if isinstance(uploaded, requests.Response):
+                    uploaded.raise_for_status()
+                elif isinstance(uploaded, dict) and uploaded.get('failed'):
+                    raise IOError(f"{uploaded['failed']} files failed to upload")
+                if publish:
+                    result['stage'] = 'publish'
+                    client.publish()
+                    result['published'] = True
+                result['stage'] = 'done'
+            except Exception as e:
+                result['error'] = e
+            result['seconds'] = time.monotonic() - start
+            return result
+
+        start = time.monotonic()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(run, jobs))
+        return {
+            'jobs': results,
+            'failed': sum(r['error'] is not None for r in results),
+            'seconds': time.monotonic() - start,
+        }
+
+    def _fork(self, deposition_id=None):
+        """a client for another project sharing this client's session, limits and caches"""
+        session = self._session
+        client = copy.copy(self)
+        client._pooled_session = session
+        client._owns_session = False
+        client.title = None
+        client.bucket = None
+        client.deposition_id = deposition_id
+        return client
+
+    def _wait_for_draft(self, dep_id, timeout=60, interval=0.1, max_interval=2):
+        """poll a new draft until its bucket is available
+
+        Args:
+            dep_id (str): deposition ID of the draft
+            timeout (float): seconds to wait before giving up
+            interval (float): seconds between the first polls, doubled after
+                every poll up to max_interval
+            max_interval (float): longest wait between two polls
+
+        Returns:
+            dict: the draft deposition
+
+        Raises:
+            TimeoutError: the draft was not ready within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            r = self._request("GET", f"{self._endpoint}/deposit/depositions/{dep_id}",
+                              auth=self._bearer_auth)
+            if r.ok and r.json().get('links', {}).get('bucket'):
+                return self._cache_deposition(r, dep_id)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"deposition {dep_id} was not ready after {timeout} seconds")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
     def publish(self):
         """ publish a record
         """
         url_action = self._get_depositions_by_id()['links']['publish']
-        r = requests.post(url_action, auth=self._bearer_auth)
+        r = self._request("POST", url_action, auth=self._bearer_auth)
+        self.invalidate_cache(self.deposition_id)
         r.raise_for_status()
         return r
 
-    def download_file(self, filename=None, dst_path=None):
+    def download_file(self, filename=None, dst_path=None, chunk_size=DOWNLOAD_CHUNK_SIZE, progress=None,
+                      resume=True, retries=3):
         """download a file from project
 
+        The file is streamed to disk in chunks, so memory use does not
+        depend on the file size. Data is written to a temporary
+        ``<filename>.part`` file which is renamed once the download completes.
+
+        If a ``.part`` file is left over from an interrupted download, only
+        the missing tail is requested with an HTTP Range header. When the
+        project is set, the result is checked against the size and checksum
+        listed in the deposition's files.
+
+        With a FileCache on the client, a file already in the cache is hard
+        linked into place and stays read-only until the cache evicts it.
+
         Args:
             filename (str): name of the file to download
             dst_path (str): destination path to download the data (default is current directory)
+            chunk_size (int): number of bytes read from the network at a time
+            progress (callable): called as progress(bytes_written, total_bytes)
+                after every chunk, total_bytes is None if the size is unknown,
+                e.g. a ProgressReporter (optional)
+            resume (bool): continue from an existing ``.part`` file
+            retries (int): number of times a dropped connection is resumed
         """
         if filename is None:
             print(" ** filename not supplied ** ")
@@ -698,26 +2908,267 @@ class Client(object):
 
         if bucket_link is not None:
             if validate_url(bucket_link):
-                r = requests.get(f"{bucket_link}/{filename}",
-                                 auth=self._bearer_auth)
-
                 # if dst_path is not set, set download to current directory
                 # else download to set dst_path
+                dst_file = filename
                 if dst_path:
                     if os.path.isdir(dst_path):
-                        filename = dst_path + '/' + filename 
+                        dst_file = dst_path + '/' + filename
                     else:
                         raise FileNotFoundError(f'{dst_path} does not exist')
-                        
-                if r.ok:
-                    with open(filename, 'wb') as f:
-                        f.write(r.content)                    
-                else:
+
+                info = self._get_file_info(filename) or {}
+                try:
+                    self._download_url(f"{bucket_link}/{filename}", dst_file,
+                                       size=info.get('filesize'), checksum=info.get('checksum'),
+                                       chunk_size=chunk_size, progress=progress,
+                                       resume=resume, retries=retries, auth=self._bearer_auth)
+                except requests.exceptions.HTTPError:
                     print(f" ** Something went wrong, check that {filename} is in your poject  ** ")
-                    
+
             else:
                 print(f' ** {bucket_link}/{filename} is not a valid URL ** ')
 
+    def _download_url(self, url, dst_file, size=None, checksum=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                      progress=None, resume=True, retries=3, auth=None):
+        """stream url to dst_file through a resumable ``.part`` file
+
+        Args:
+            url (str): URL of the file
+            dst_file (str): destination file
+            size (int): expected size in bytes, checked when supplied (optional)
+            checksum (str): expected checksum, 'md5:<digest>' or a bare md5 digest (optional)
+            chunk_size (int): number of bytes read from the network at a time
+            progress (callable): called as progress(bytes_written, total_bytes) (optional)
+            resume (bool): continue from an existing ``.part`` file. One left by an
+                earlier call is only resumed when size or checksum is known
+            retries (int): number of times a dropped connection is resumed
+            auth (requests.auth.AuthBase): authentication for the request (optional)
+
+        Returns:
+            int: size of the downloaded file
+        """
+        cache = self._file_cache
+        if cache is None or not checksum:
+            return self._fetch_url(url, dst_file, size, checksum, chunk_size, progress, resume, retries, auth)
+
+        # one worker downloads a given file, the others wait and link it from the cache
+        with cache.lock(checksum):
+            if cache.fetch(checksum, dst_file):
+                received = os.path.getsize(dst_file)
+                if progress is not None:
+                    progress(received, received)
+                return received
+            received = self._fetch_url(url, dst_file, size, checksum, chunk_size, progress, resume, retries, auth)
+            cache.store(checksum, dst_file)
+            return received
+
+    def _fetch_url(self, url, dst_file, size, checksum, chunk_size, progress, resume, retries, auth):
+        """network part of _download_url
+
+        The checksum is computed from the chunks as they are written, only
+        the bytes already present in a resumed ``.part`` file are read back.
+        """
+        part = f"{dst_file}.part"
+        algorithm, digest = parse_checksum(checksum) if checksum else (None, None)
+        hasher = None
+        # a .part left by an earlier call is only resumed when the result can be
+        # checked, one written by this call is resumed with If-Range on its ETag
+        checked = size is not None or algorithm is not None
+        etag = None
+
+        for attempt in range(retries + 1):
+            offset = os.path.getsize(part) if resume and (checked or etag) and os.path.exists(part) else 0
+            if size is not None and offset >= size:
+                if offset == size:
+                    hasher = file_checksum(part, algorithm, chunk_size) if algorithm else None
+                    break
+                offset = 0
+
+            headers = {}
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+                if etag:
+                    headers['If-Range'] = etag
+            try:
+                r = self._request("GET", url, headers=headers, auth=auth, stream=True)
+                if offset and (r.status_code == 416
+                               or r.status_code == 206 and _content_range_start(r.headers) != offset):
+                    # the server cannot serve the requested range, start over
+                    r.close()
+                    offset = 0
+                    r = self._request("GET", url, auth=auth, stream=True)
+                with r:
+                    r.raise_for_status()
+                    if r.headers.get('ETag') and not r.headers['ETag'].startswith('W/'):
+                        etag = r.headers['ETag']
+                    # the server ignored the Range header or the file changed, start over
+                    if r.status_code != 206:
+                        offset = 0
+                    if algorithm:
+                        hasher = file_checksum(part, algorithm, chunk_size) if offset else hashlib.new(algorithm)
+                    stream_to_file(r, part, chunk_size=chunk_size, progress=progress,
+                                   offset=offset, total=size, hasher=hasher, limiter=self._bandwidth)
+                break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout):
+                if not resume or attempt == retries:
+                    raise
+
+        received = os.path.getsize(part)
+        if size is not None and received != size:
+            os.remove(part)
+            raise IOError(f"{dst_file} is {received} bytes, expected {size}")
+        if hasher is not None and hasher.hexdigest() != digest:
+            os.remove(part)
+            raise IOError(f"{dst_file} does not match its {algorithm} checksum")
+        os.replace(part, dst_file)
+        return received
+
+    def download_all(self, doi_or_dep_id, dst_path='.', max_workers=4, retries=3,
+                     chunk_size=DOWNLOAD_CHUNK_SIZE, progress=None):
+        """download every file of a record or deposition concurrently, smallest files first
+
+        With a FileCache on the client, files already in the cache are hard
+        linked into place and stay read-only until the cache evicts them.
+
+        Args:
+            doi_or_dep_id (str or int): a zenodo doi (10.5281/zenodo.[0-9]+) of a
+                published record, or the deposition ID of one of your projects
+            dst_path (str): destination directory, created if it does not exist
+            max_workers (int): maximum number of files downloaded at once
+            retries (int): number of times a file is downloaded again after its
+                stream broke or it came out truncated or corrupted, failed
+                requests are retried by the client's retry policy
+            chunk_size (int): number of bytes read from the network at a time
+            progress (callable): called as progress(bytes_done, total_bytes) for
+                the whole batch, from the worker threads (optional)
+
+        Returns:
+            dict: report with per file results under 'files' (filename, bytes,
+                seconds and error, a ValueError for a file whose name would
+                place it outside dst_path), the number of 'failed' files, total
+                'bytes', wall-clock 'seconds' and 'throughput' in bytes/s
+        """
+        files = self._list_remote_files(doi_or_dep_id)
+        os.makedirs(dst_path, exist_ok=True)
+
+        total = sum(f['size'] or 0 for f in files)
+        done = {}
+        lock = threading.Lock()
+
+        def report(filename):
+            def callback(written, _):
+                with lock:
+                    done[filename] = written
+                    if progress is not None:
+                        progress(sum(done.values()), total)
+            return callback
+
+        def fetch(file):
+            try:
+                dst_file = _local_path(dst_path, file['filename'])
+            except ValueError as e:
+                return {'filename': file['filename'], 'bytes': 0, 'seconds': 0.0, 'error': e}
+
+            def download():
+                return self._download_url(file['url'], dst_file, size=file['size'], checksum=file['checksum'],
+                                          chunk_size=chunk_size, progress=report(file['filename']),
+                                          retries=0, auth=file['auth'])
+            return _transfer_file(file['filename'], download, retries, _broken_download)
+
+        start = time.monotonic()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = _smallest_first(executor, fetch, files, [f['size'] for f in files])
+        return transfer_report(results, time.monotonic() - start)
+
+    def verify(self, dst_path, doi_or_dep_id, max_workers=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """check a local copy of a record or deposition against its files metadata
+
+        Files are hashed concurrently; hashlib releases the GIL on large
+        chunks, so the threads use several cores.
+
+        Args:
+            dst_path (str): directory holding the downloaded files
+            doi_or_dep_id (str or int): a zenodo doi (10.5281/zenodo.[0-9]+) of a
+                published record, or the deposition ID of one of your projects
+            max_workers (int): maximum number of files hashed at once,
+                defaults to the number of CPUs
+            chunk_size (int): number of bytes hashed at a time
+
+        Returns:
+            dict: report with per file results under 'files' (filename, bytes,
+                seconds and error, an IOError for missing, truncated or
+                corrupted files, a ValueError for a file whose name would
+                place it outside dst_path), the number of 'failed' files, total
+                'bytes', wall-clock 'seconds' and 'throughput' in bytes/s
+        """
+        files = self._list_remote_files(doi_or_dep_id)
+
+        def check(file):
+            start = time.monotonic()
+            result = {'filename': file['filename'], 'bytes': 0, 'seconds': 0.0, 'error': None}
+            try:
+                path = _local_path(dst_path, file['filename'])
+            except ValueError as e:
+                result['error'] = e
+                return result
+            if not os.path.isfile(path):
+                result['error'] = IOError(f"{path} is missing")
+            elif file['size'] is not None and os.path.getsize(path) != file['size']:
+                result['error'] = IOError(f"{path} is {os.path.getsize(path)} bytes, expected {file['size']}")
+            else:
+                result['bytes'] = os.path.getsize(path)
+                if file['checksum']:
+                    algorithm, digest = parse_checksum(file['checksum'])
+                    if file_checksum(path, algorithm, chunk_size).hexdigest() != digest:
+                        result['error'] = IOError(f"{path} does not match its {algorithm} checksum")
+            result['seconds'] = time.monotonic() - start
+            return result
+
+        start = time.monotonic()
+        with futures.ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            results = list(executor.map(check, files))
+        return transfer_report(results, time.monotonic() - start)
+
+    def _list_remote_files(self, doi_or_dep_id):
+        """files of a published record or of one of your depositions
+
+        Args:
+            doi_or_dep_id (str or int): zenodo doi or deposition ID
+
+        Returns:
+            list: dicts with filename, url, size, checksum and the auth to use
+        """
+        if isinstance(doi_or_dep_id, str) and self._is_doi(doi_or_dep_id):
+            record = self._get_record(self._get_record_id_from_doi(doi_or_dep_id))
+            return [{'filename': f['key'], 'url': f['links']['self'], 'size': f.get('size'),
+                     'checksum': f.get('checksum'), 'auth': None}
+                    for f in record['files']]
+
+        return [{'filename': f['filename'], 'url': f['links']['download'], 'size': f.get('filesize'),
+                 'checksum': f.get('checksum'), 'auth': self._bearer_auth}
+                for f in self._get_deposition(doi_or_dep_id)['files']]
+
+    def _get_file_info(self, filename):
+        """file entry of the current project for filename
+
+        Args:
+            filename (str): name of the file
+
+        Returns:
+            dict: the file entry (filename, filesize, checksum, ...) or None
+                if no project is set or the file is not listed
+        """
+        if self.deposition_id is None:
+            return None
+        dep = self._get_depositions_by_id()
+        for file in (dep or {}).get('files', []):
+            if file.get('filename') == filename:
+                return file
+        return None
+
     def _is_doi(self, string=None):
         """test if string is of the form of a zenodo doi
         10.5281.zenodo.[0-9]+
@@ -757,9 +3208,36 @@ class Client(object):
         else:
             print(f"{doi} must be of the form: 10.5281/zenodo.[0-9]+")
 
+        return [f['links']['self'] for f in self._get_record(record_id)['files']]
+
+    def _get_record(self, record_id):
+        """gets a published record
+
+        Args:
+            record_id (str): the record id
+
+        Returns:
+            dict: the record metadata
+        """
+        cache = self._record_cache
+        # sandbox and production records share ids
+        url = f"{self._endpoint}/records/{record_id}"
+        if cache is not None:
+            record = cache.get(url)
+            if record is not None:
+                return record
+            if cache.offline:
+                raise LookupError(f"record {record_id} is not cached and the record cache is offline")
+
         # get request (do not need to provide access token since public
-        r = requests.get(f"https://zenodo.org/api/records/{record_id}")  # params={'access_token': ACCESS_TOKEN})
-        return [f['links']['self'] for f in r.json()['files']]
+        r = self._request("GET", url)  # params={'access_token': ACCESS_TOKEN})
+        r.raise_for_status()
+        record = r.json()
+        # a concept record id resolves to the latest version, which changes,
+        # so the record is stored under the id of that version only
+        if cache is not None and record.get('id') is not None:
+            cache.put(f"{self._endpoint}/records/{record['id']}", record)
+        return record
 
     def _get_latest_record(self, record_id=None):
         """return the latest record id for given record id
@@ -770,23 +3248,30 @@ class Client(object):
         Returns:
             str: the latest record id or 'None' if not found
         """
+        if record_id is None:
+            record_id = self.deposition_id
+
         try:
-            record = self._get_depositions_by_id()['links']['latest'].split('/')[-1]
-        except:
-            record = 'None'
-        return record
+            return self._summarize_deposition(self._get_deposition(record_id))['latest']
+        except requests.exceptions.HTTPError:
+            return 'None'
 
     def delete_file(self, filename=None):
         """delete a file from a project
 
         Args:
             filename (str): the name of file to delete
+
+        Returns:
+            requests.Response: the response to the DELETE request
         """
         bucket_link = self.bucket
 
         # with open(file_path, "rb") as fp:
-        _ = requests.delete(f"{bucket_link}/{filename}",
-                            auth=self._bearer_auth)
+        r = self._request("DELETE", f"{bucket_link}/{filename}",
+                          auth=self._bearer_auth)
+        self.invalidate_cache(self.deposition_id)
+        return r
 
     def _delete_project(self, dep_id=None):
         """delete a project from repository by ID
@@ -797,12 +3282,14 @@ class Client(object):
         print('')
         # if input("are you sure you want to delete this project? (y/n)") == "y":
         # delete requests, we are deleting the resource at the specified URL
-        r = requests.delete(
+        r = self._request(
+            "DELETE",
             f"{self._endpoint}/deposit/depositions/{self.deposition_id}",
             auth=self._bearer_auth,
         )
         # response status
         print(r.status_code)
+        self.invalidate_cache(self.deposition_id)
 
         # reset class variables to None
         self.title = None
@@ -0,0 +1,452 @@
+"""
+In-process stand-in for the Zenodo REST API
+
+FakeZenodo serves depositions, buckets, new versions, publishing and
+records over HTTP on 127.0.0.1, so a real zenodopy.Client can be run
+against it without a token or network access. Latency, bandwidth and
+failures can be injected, and every request is recorded for the
+benchmarks in test_benchmarks.py.
+
+    ```
+    with FakeZenodo(latency=0.01) as server:
+        dep = server.add_deposition('project', {'data.txt': b'data'})
+        zeno = server.client()
+        zeno.set_project(dep['id'])
+        print(server.summary())
+    ```
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import zenodopy
+
+IO_BLOCK_SIZE = 64 * 1024
+
+
+class FakeZenodo(object):
+    """fake Zenodo API running in a background thread
+
+    Args:
+        latency (float): seconds added before every response
+        bandwidth (float): bytes per second at which request and response
+            bodies are transferred on each connection, unlimited if None
+        error_rate (float): probability of answering a request with error_status
+        error_status (int): status of the injected failures
+        draft_delay (float): seconds before a new version draft gets its bucket
+        seed (int): seed of the error injection
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, error_rate=0.0, error_status=503,
+                 draft_delay=0.0, seed=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.draft_delay = draft_delay
+        self._random = random.Random(seed)
+        self._failures = []
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self.depositions = {}
+        self.buckets = {}
+        self.records = {}
+        self.requests = []
+        self._server = None
+        self._thread = None
+
+    # ---------------------------------------------
+    # server lifecycle
+    # ---------------------------------------------
+
+    def start(self):
+        """start serving on a free port"""
+        handler = type('Handler', (_Handler,), {'fake': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def api(self):
+        return f"{self.url}/api"
+
+    def client(self, **kwargs):
+        """a zenodopy.Client pointed at the server
+
+        Retries do not wait and the rate limiter is disabled unless
+        given in kwargs.
+        """
+        kwargs.setdefault('token', 'fake')
+        kwargs.setdefault('retry', zenodopy.RetryPolicy(backoff=0))
+        kwargs.setdefault('rate_limiter', False)
+        zeno = zenodopy.Client(**kwargs)
+        zeno._endpoint = self.api
+        return zeno
+
+    # ---------------------------------------------
+    # state
+    # ---------------------------------------------
+
+    def add_deposition(self, title, files=None, published=False):
+        """create a deposition directly on the server
+
+        Args:
+            title (str): title of the deposition
+            files (dict): {filename: content} of the deposition
+            published (bool): publish the deposition
+
+        Returns:
+            dict: the deposition as returned by the API
+        """
+        with self._lock:
+            dep = self._new_deposition({'title': title})
+            self.buckets[dep['bucket']].update(files or {})
+            if published:
+                self._publish(dep)
+            return self._render(dep)
+
+    def fail_next(self, count=1, status=503):
+        """answer the next count requests with status"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def reset_stats(self):
+        """forget the recorded requests"""
+        with self._lock:
+            self.requests = []
+
+    def summary(self):
+        """totals of the recorded requests
+
+        Returns:
+            dict: number of 'requests', 'bytes_in' received, 'bytes_out'
+                sent, number of 'errors' and request counts 'by_route',
+                keyed by handler name (e.g. 'get_deposition')
+        """
+        with self._lock:
+            by_route = {}
+            for request in self.requests:
+                by_route[request['route']] = by_route.get(request['route'], 0) + 1
+            return {
+                'requests': len(self.requests),
+                'bytes_in': sum(r['bytes_in'] for r in self.requests),
+                'bytes_out': sum(r['bytes_out'] for r in self.requests),
+                'errors': sum(r['status'] >= 400 for r in self.requests),
+                'by_route': by_route,
+            }
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def _new_deposition(self, metadata, concept=None):
+        dep_id = self._new_id()
+        dep = {'id': dep_id, 'conceptrecid': str(concept or self._new_id()), 'metadata': dict(metadata),
+               'submitted': False, 'state': 'unsubmitted', 'bucket': f"b{dep_id}",
+               'ready_at': 0.0, 'latest_draft': None}
+        self.depositions[dep_id] = dep
+        self.buckets[dep['bucket']] = {}
+        return dep
+
+    def _publish(self, dep):
+        dep['submitted'] = True
+        dep['state'] = 'done'
+        dep['latest_draft'] = None
+        self.records[dep['id']] = {'id': dep['id'], 'conceptrecid': dep['conceptrecid'],
+                                   'metadata': dict(dep['metadata']),
+                                   'files': dict(self.buckets[dep['bucket']])}
+
+    def _latest(self, dep):
+        published = [d['id'] for d in self.depositions.values()
+                     if d['conceptrecid'] == dep['conceptrecid'] and d['submitted']]
+        return max(published) if published else None
+
+    def _render(self, dep):
+        api = self.api
+        dep_url = f"{api}/deposit/depositions/{dep['id']}"
+        links = {'self': dep_url, 'html': dep_url,
+                 'publish': f"{dep_url}/actions/publish",
+                 'newversion': f"{dep_url}/actions/newversion"}
+        if time.monotonic() >= dep['ready_at']:
+            links['bucket'] = f"{api}/files/{dep['bucket']}"
+        if dep['latest_draft'] is not None:
+            links['latest_draft'] = f"{api}/deposit/depositions/{dep['latest_draft']}"
+        latest = self._latest(dep)
+        if latest is not None:
+            links['latest'] = f"{api}/records/{latest}"
+        files = [{'id': f"{dep['bucket']}-{name}", 'filename': name, 'filesize': len(content),
+                  'checksum': hashlib.md5(content).hexdigest(),
+                  'links': {'download': f"{api}/files/{dep['bucket']}/{name}"}}
+                 for name, content in sorted(self.buckets[dep['bucket']].items())]
+        return {'id': dep['id'], 'conceptrecid': dep['conceptrecid'], 'title': dep['metadata'].get('title'),
+                'metadata': dep['metadata'], 'submitted': dep['submitted'], 'state': dep['state'],
+                'links': links, 'files': files}
+
+    def _render_record(self, record):
+        api = self.api
+        return {'id': record['id'], 'conceptrecid': record['conceptrecid'], 'metadata': record['metadata'],
+                'links': {'self': f"{api}/records/{record['id']}"},
+                'files': [{'key': name, 'size': len(content), 'checksum': f"md5:{hashlib.md5(content).hexdigest()}",
+                           'links': {'self': f"{api}/records/{record['id']}/files/{name}/content"}}
+                          for name, content in sorted(record['files'].items())]}
+
+    # ---------------------------------------------
+    # request handling
+    # ---------------------------------------------
+
+    def _injected_failure(self):
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _dispatch(self, method, path, query, headers, body):
+        """answer a request, returns (route, status, payload, response headers)"""
+        for route_method, pattern, name in _ROUTES:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                with self._lock:
+                    status, payload, extra = getattr(self, name)(query=query, headers=headers, body=body,
+                                                                 **match.groupdict())
+                return name, status, payload, extra
+        return f"{method} {path}", 404, {'status': 404, 'message': 'not found'}, {}
+
+    def _find(self, dep_id):
+        return self.depositions.get(int(dep_id))
+
+    def list_depositions(self, query, **_):
+        deps = sorted(self.depositions.values(), key=lambda d: d['id'], reverse=True)
+        status = query.get('status')
+        if status == 'draft':
+            deps = [d for d in deps if not d['submitted']]
+        elif status == 'published':
+            deps = [d for d in deps if d['submitted']]
+        page, size = int(query.get('page', 1)), int(query.get('size', 10))
+        link = f'<{self.api}/deposit/depositions?page={page}&size={size}>; rel="self"'
+        if page * size < len(deps):
+            link += f', <{self.api}/deposit/depositions?page={page + 1}&size={size}>; rel="next"'
+        return 200, [self._render(d) for d in deps[(page - 1) * size:page * size]], {'Link': link}
+
+    def create_deposition(self, body, **_):
+        metadata = json.loads(body or b'{}').get('metadata', {})
+        return 201, self._render(self._new_deposition(metadata)), {}
+
+    def get_deposition(self, dep_id, headers, **_):
+        dep = self._find(dep_id)
+        if dep is None:
+            return 404, {'status': 404, 'message': 'PID does not exist.'}, {}
+        payload = self._render(dep)
+        etag = '"%s"' % hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        if headers.get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+        return 200, payload, {'ETag': etag}
+
+    def update_deposition(self, dep_id, body, **_):
+        dep = self._find(dep_id)
+        if dep is None:
+            return 404, {'status': 404, 'message': 'PID does not exist.'}, {}
+        if dep['submitted']:
+            return 400, {'status': 400, 'message': 'Deposition is published.'}, {}
+        dep['metadata'] = json.loads(body)['metadata']
+        return 200, self._render(dep), {}
+
+    def delete_deposition(self, dep_id, **_):
+        dep = self._find(dep_id)
+        if dep is None or dep['submitted']:
+            return 403 if dep else 404, {}, {}
+        del self.depositions[dep['id']]
+        del self.buckets[dep['bucket']]
+        return 204, None, {}
+
+    def new_version(self, dep_id, **_):
+        dep = self._find(dep_id)
+        if dep is None:
+            return 404, {'status': 404, 'message': 'PID does not exist.'}, {}
+        if not dep['submitted']:
+            return 400, {'status': 400, 'message': 'Deposition is not published.'}, {}
+        draft = self._new_deposition(dep['metadata'], concept=dep['conceptrecid'])
+        draft['ready_at'] = time.monotonic() + self.draft_delay
+        self.buckets[draft['bucket']].update(self.buckets[dep['bucket']])
+        dep['latest_draft'] = draft['id']
+        return 201, self._render(dep), {}
+
+    def publish(self, dep_id, **_):
+        dep = self._find(dep_id)
+        if dep is None:
+            return 404, {'status': 404, 'message': 'PID does not exist.'}, {}
+        if dep['submitted']:
+            return 400, {'status': 400, 'message': 'Deposition is already published.'}, {}
+        self._publish(dep)
+        for other in self.depositions.values():
+            if other['latest_draft'] == dep['id']:
+                other['latest_draft'] = None
+        return 202, self._render(dep), {}
+
+    def put_file(self, bucket, name, body, **_):
+        if bucket not in self.buckets:
+            return 404, {'status': 404, 'message': 'Bucket does not exist.'}, {}
+        self.buckets[bucket][name] = body
+        return 201, {'key': name, 'size': len(body), 'checksum': f"md5:{hashlib.md5(body).hexdigest()}"}, {}
+
+    def get_file(self, bucket, name, headers, **_):
+        content = self.buckets.get(bucket, {}).get(name)
+        if content is None:
+            return 404, {'status': 404, 'message': 'Object does not exist.'}, {}
+        return _ranged(content, headers)
+
+    def delete_file(self, bucket, name, **_):
+        if self.buckets.get(bucket, {}).pop(name, None) is None:
+            return 404, {'status': 404, 'message': 'Object does not exist.'}, {}
+        return 204, None, {}
+
+    def list_records(self, query, **_):
+        records = sorted(self.records.values(), key=lambda r: r['id'], reverse=True)
+        page, size = int(query.get('page', 1)), int(query.get('size', 10))
+        hits = [self._render_record(r) for r in records[(page - 1) * size:page * size]]
+        links = {'self': f"{self.api}/records?page={page}&size={size}"}
+        if page * size < len(records):
+            links['next'] = f"{self.api}/records?page={page + 1}&size={size}"
+        return 200, {'hits': {'hits': hits, 'total': len(records)}, 'links': links}, {}
+
+    def get_record(self, record_id, **_):
+        record = self.records.get(int(record_id))
+        if record is None:
+            return 404, {'status': 404, 'message': 'PID does not exist.'}, {}
+        return 200, self._render_record(record), {}
+
+    def get_record_file(self, record_id, name, headers, **_):
+        record = self.records.get(int(record_id))
+        content = record['files'].get(name) if record else None
+        if content is None:
+            return 404, {'status': 404, 'message': 'Object does not exist.'}, {}
+        return _ranged(content, headers)
+
+
+_ROUTES = [
+    ('GET', r'/api/deposit/depositions', 'list_depositions'),
+    ('POST', r'/api/deposit/depositions', 'create_deposition'),
+    ('GET', r'/api/deposit/depositions/(?P<dep_id>\d+)', 'get_deposition'),
+    ('PUT', r'/api/deposit/depositions/(?P<dep_id>\d+)', 'update_deposition'),
+    ('DELETE', r'/api/deposit/depositions/(?P<dep_id>\d+)', 'delete_deposition'),
+    ('POST', r'/api/deposit/depositions/(?P<dep_id>\d+)/actions/newversion', 'new_version'),
+    ('POST', r'/api/deposit/depositions/(?P<dep_id>\d+)/actions/publish', 'publish'),
+    ('PUT', r'/api/files/(?P<bucket>[^/]+)/(?P<name>[^/]+)', 'put_file'),
+    ('GET', r'/api/files/(?P<bucket>[^/]+)/(?P<name>[^/]+)', 'get_file'),
+    ('DELETE', r'/api/files/(?P<bucket>[^/]+)/(?P<name>[^/]+)', 'delete_file'),
+    ('GET', r'/api/records', 'list_records'),
+    ('GET', r'/api/records/(?P<record_id>\d+)', 'get_record'),
+    ('GET', r'/api/records/(?P<record_id>\d+)/files/(?P<name>[^/]+)/content', 'get_record_file'),
+]
+
+
+def _ranged(content, headers):
+    """file response honouring a 'bytes=<start>-' Range header"""
+    match = re.fullmatch(r'bytes=(\d+)-', headers.get('Range', ''))
+    if match and int(match.group(1)) < len(content):
+        start = int(match.group(1))
+        return 206, content[start:], {'Content-Range': f"bytes {start}-{len(content) - 1}/{len(content)}"}
+    return 200, content, {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, Nagle would hold the body back
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, *args):
+        pass
+
+    def _throttle(self, nbytes):
+        if self.fake.bandwidth:
+            time.sleep(nbytes / self.fake.bandwidth)
+
+    def _receive(self, length):
+        parts = []
+        while length > 0:
+            block = self.rfile.read(min(IO_BLOCK_SIZE, length))
+            if not block:
+                break
+            self._throttle(len(block))
+            parts.append(block)
+            length -= len(block)
+        return b''.join(parts)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(parts)
+                parts.append(self._receive(size))
+                self.rfile.readline()
+        return self._receive(int(self.headers.get('Content-Length') or 0))
+
+    def _handle(self):
+        start = time.monotonic()
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self._read_body()
+
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        failure = self.fake._injected_failure()
+        if failure is not None:
+            route, status, payload, extra = 'injected', failure, {'status': failure, 'message': 'injected'}, {}
+        else:
+            route, status, payload, extra = self.fake._dispatch(self.command, url.path, query, self.headers, body)
+
+        if payload is None:
+            data = b''
+        elif isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload).encode()
+        # recorded before answering, the client may look at the stats as soon as it has the response
+        with self.fake._lock:
+            self.fake.requests.append({'method': self.command, 'route': route, 'status': status,
+                                       'bytes_in': len(body), 'bytes_out': len(data),
+                                       'seconds': time.monotonic() - start})
+        self.send_response(status)
+        content_type = 'application/octet-stream' if isinstance(payload, bytes) else 'application/json'
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in extra.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            for offset in range(0, len(data), IO_BLOCK_SIZE):
+                block = data[offset:offset + IO_BLOCK_SIZE]
+                self.wfile.write(block)
+                self._throttle(len(block))
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
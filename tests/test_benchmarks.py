@@ -0,0 +1,199 @@
+"""
+End-to-end benchmarks of zenodopy against the in-process FakeZenodo server.
+
+Every benchmark reports the number of requests, bytes sent and received,
+latency percentiles and throughput of a user facing call, and asserts the
+request counts so a change that adds round trips fails the suite. Run with
+``pytest tests/test_benchmarks.py -s`` to see the report; set
+ZENODOPY_BENCH_JSON to a path to also write the results as JSON, e.g. to
+compare two versions of the library.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import zenodopy as zen
+from .fake_zenodo import FakeZenodo
+
+RESULTS = []
+
+
+@pytest.fixture(scope='module', autouse=True)
+def report():
+    yield
+    for result in RESULTS:
+        print(f"\n{result['name']:<18} {result['iterations']:>3}x "
+              f"p50 {result['p50'] * 1000:8.2f} ms  p95 {result['p95'] * 1000:8.2f} ms  "
+              f"p99 {result['p99'] * 1000:8.2f} ms  {result['requests']:5.1f} req  "
+              f"{result['throughput'] / 1e6:8.2f} MB/s")
+    if os.environ.get('ZENODOPY_BENCH_JSON'):
+        with open(os.environ['ZENODOPY_BENCH_JSON'], 'w') as f:
+            json.dump(RESULTS, f, indent=2)
+
+
+@pytest.fixture
+def server():
+    with FakeZenodo() as fake:
+        yield fake
+
+
+def percentile(values, q):
+    """nearest-rank percentile of values, q between 0 and 100"""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+
+def bench(name, server, func, iterations=5, setup=None):
+    """time func over several iterations and record the server traffic
+
+    Args:
+        name (str): name of the benchmark in the report
+        server (FakeZenodo): server the client talks to
+        func (callable): the call to measure
+        iterations (int): number of timed calls
+        setup (callable): run untimed before every call (optional)
+
+    Returns:
+        dict: timings in seconds ('p50', 'p95', 'p99', 'max'), mean
+            'requests' and body 'bytes' per call and 'throughput' in bytes/s
+            of the request and response bodies
+    """
+    timings, requests, nbytes = [], 0, 0
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        server.reset_stats()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        summary = server.summary()
+        requests += summary['requests']
+        nbytes += summary['bytes_in'] + summary['bytes_out']
+    result = {
+        'name': name,
+        'iterations': iterations,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'max': max(timings),
+        'requests': requests / iterations,
+        'bytes': nbytes / iterations,
+        'throughput': nbytes / sum(timings),
+    }
+    RESULTS.append(result)
+    return result
+
+
+def test_bench_import():
+    # modules a short-lived script must not pay for when it only imports zenodopy and creates a Client
+    lazy = {'asyncio', 'concurrent.futures', 'email.utils', 'requests', 'sqlite3', 'tarfile', 'zipfile'}
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import zenodopy\n"
+            "zenodopy.Client(token='fake')\n"
+            "print(time.perf_counter() - start)\n"
+            f"print(sorted(set(sys.modules) & {lazy!r}))")
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(zen.__file__)))
+    timings = []
+    for _ in range(5):
+        # -S: no site packages, whose .pth hooks may import some of these modules themselves
+        out = subprocess.run([sys.executable, '-S', '-c', code], env=env, capture_output=True,
+                             text=True, check=True).stdout.splitlines()
+        timings.append(float(out[0]))
+        assert out[1] == '[]'
+    RESULTS.append({'name': 'import', 'iterations': len(timings), 'p50': percentile(timings, 50),
+                    'p95': percentile(timings, 95), 'p99': percentile(timings, 99), 'max': max(timings),
+                    'requests': 0, 'bytes': 0, 'throughput': 0.0})
+    assert percentile(timings, 50) < 0.5
+
+
+def test_bench_list_projects(server, capsys):
+    for i in range(150):
+        server.add_deposition(f'project {i}')
+    zeno = server.client()
+    result = bench('list_projects', server, lambda: zeno.list_projects)
+    assert capsys.readouterr().out.count('project ') == 5 * 150
+    assert result['requests'] == 2
+
+
+def test_bench_set_project(server):
+    deps = [server.add_deposition(f'project {i}', published=True) for i in range(20)]
+    zeno = server.client()
+    result = bench('set_project', server, lambda: zeno.set_project(deps[3]['id']))
+    assert zeno.bucket == deps[3]['links']['bucket']
+    assert result['requests'] == 1
+
+
+def test_bench_upload_file(server, tmp_path):
+    data = os.urandom(8 * 1024 * 1024)
+    (tmp_path / 'data.bin').write_bytes(data)
+    dep = server.add_deposition('upload')
+    zeno = server.client(deposition_id=dep['id'], bucket=dep['links']['bucket'])
+    result = bench('upload_file', server, lambda: zeno.upload_file(str(tmp_path / 'data.bin')))
+    assert server.buckets[f"b{dep['id']}"]['data.bin'] == data
+    assert result['requests'] == 1
+    assert result['bytes'] >= len(data)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_bench_upload_zip(server, tmp_path, monkeypatch, stream):
+    source = tmp_path / 'source'
+    source.mkdir()
+    for i in range(20):
+        (source / f'f{i}.txt').write_bytes(os.urandom(64 * 1024))
+    monkeypatch.chdir(tmp_path)
+    dep = server.add_deposition('zip')
+    zeno = server.client(deposition_id=dep['id'], bucket=dep['links']['bucket'])
+    result = bench(f"upload_zip{'_stream' if stream else ''}", server,
+                   lambda: zeno.upload_zip(str(source), stream=stream, workers=2))
+    assert 'source.zip' in server.buckets[f"b{dep['id']}"]
+    assert result['requests'] == 1
+
+
+def test_bench_download_file(server, tmp_path):
+    data = os.urandom(8 * 1024 * 1024)
+    dep = server.add_deposition('download', {'data.bin': data})
+    zeno = server.client(deposition_id=dep['id'], bucket=dep['links']['bucket'], cache_ttl=0)
+    result = bench('download_file', server, lambda: zeno.download_file('data.bin', str(tmp_path)),
+                   setup=lambda: (tmp_path / 'data.bin').unlink() if (tmp_path / 'data.bin').exists() else None)
+    assert (tmp_path / 'data.bin').read_bytes() == data
+    # the deposition is revalidated with a bodiless 304, then the file is fetched
+    assert result['requests'] == 2
+
+
+def test_bench_update(tmp_path):
+    (tmp_path / 'data.txt').write_bytes(os.urandom(1024 * 1024))
+    with FakeZenodo(latency=0.002, draft_delay=0.05) as server:
+        dep = server.add_deposition('release', {'old.txt': b'old'}, published=True)
+        zeno = server.client()
+        zeno.set_project(dep['id'])
+        result = bench('update', server, lambda: zeno.update(
+            zen.ZenodoMetadata(title='release'), source=str(tmp_path / 'data.txt'), publish=True), iterations=3)
+        assert zeno.deposition_id == max(server.records)
+        assert sorted(server.records[zeno.deposition_id]['files']) == ['data.txt', 'old.txt']
+    # get, newversion, a few draft polls, metadata, upload, publish
+    assert result['requests'] <= 10
+
+
+def test_bench_retries(server, tmp_path):
+    (tmp_path / 'data.bin').write_bytes(os.urandom(1024 * 1024))
+    dep = server.add_deposition('faults')
+    zeno = server.client(deposition_id=dep['id'], bucket=dep['links']['bucket'])
+    result = bench('upload_retried', server, lambda: zeno.upload_file(str(tmp_path / 'data.bin')),
+                   setup=lambda: server.fail_next(2), iterations=3)
+    assert result['requests'] == 3
+    assert 'data.bin' in server.buckets[f"b{dep['id']}"]
+
+
+def test_bench_bandwidth(tmp_path):
+    data = os.urandom(1024 * 1024)
+    with FakeZenodo(bandwidth=8 * 1024 * 1024) as server:
+        dep = server.add_deposition('slow', {'data.bin': data})
+        zeno = server.client(bucket=dep['links']['bucket'])
+        result = bench('download_8MB/s', server, lambda: zeno.download_file('data.bin', str(tmp_path)),
+                       iterations=3)
+    assert result['p50'] >= len(data) / (8 * 1024 * 1024)
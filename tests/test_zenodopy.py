@@ -14,9 +14,21 @@ Note:
     have been merged upstream to keep the changes incremental.
 """
 import pytest
+import gzip
+import hashlib
+import io
+import json
+import requests
+import tarfile
+import threading
+import time
+import types
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # use this when using pytest
 import os
+import stat
 ACCESS_TOKEN = os.getenv('ZENODO_TOKEN')
 DEPOSITION_ID = os.getenv('DEPOSITION_ID')
 
@@ -36,6 +48,953 @@ def test_read_config():
         zeno._read_config()
 
 
+# retry immediately in offline tests
+NO_WAIT = zen.RetryPolicy(backoff=0)
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    """transport adapter answering from a dict of {(method, url): (status, body)}
+
+    A route can also be a callable taking the request and returning (status, body).
+    Either can add a dict of response headers as a third item.
+    """
+
+    def __init__(self, routes=None):
+        super().__init__()
+        self.routes = routes or {}
+        self.calls = []
+        self.closed = False
+
+    def send(self, request, **kwargs):
+        self.calls.append((request.method, request.url))
+        route = self.routes.get((request.method, request.url), (404, {}))
+        status, body, *headers = route(request) if callable(route) else route
+        r = requests.Response()
+        r.status_code = status
+        r.headers.update(*headers)
+        r.url = request.url
+        r.request = request
+        body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        r.headers['Content-Length'] = str(len(body))
+        r.raw = io.BytesIO(body)
+        return r
+
+    def close(self):
+        self.closed = True
+
+
+def test_token_read_once(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('ACCESS_TOKEN', str(tmp_path / 'missing'))
+    zeno = zen.Client()
+    assert [zeno._token for _ in range(3)] == [None] * 3
+    assert capsys.readouterr().out.count('No token was found') == 1
+
+    (tmp_path / 'token').write_text('ACCESS_TOKEN: secret\n')
+    monkeypatch.setenv('ACCESS_TOKEN', str(tmp_path / 'token'))
+    assert zen.Client()._token == 'secret'
+    assert zen.Client(token='given')._token == 'given'
+
+
+def test_client_session():
+    url = 'https://zenodo.org/api/deposit/depositions'
+    adapter = FakeAdapter({('GET', url): (200, [{'id': 1}])})
+    with zen.Client(token='fake', retry=NO_WAIT, adapter=adapter) as zeno:
+        session = zeno._session
+        assert zeno._get_depositions() == [{'id': 1}]
+        assert zeno._get_depositions() == [{'id': 1}]
+        assert zeno._session is session
+    assert len(adapter.calls) == 2
+    assert adapter.closed
+
+    # a session supplied by the caller is not closed by the client
+    session = zen.make_session(adapter=FakeAdapter())
+    with zen.Client(token='fake', retry=NO_WAIT, session=session) as zeno:
+        assert zeno._session is session
+    assert not session.get_adapter(url).closed
+
+
+def test_projects():
+    url = 'https://zenodo.org/api/deposit/depositions?page=2&size=2'
+    deps = [
+        {'id': 11, 'title': 'a', 'submitted': True, 'conceptrecid': '10',
+         'links': {'latest': 'https://zenodo.org/api/records/12', 'bucket': 'https://zenodo.org/api/files/b1'}},
+        {'id': 21, 'title': 'b', 'submitted': False, 'links': {}},
+    ]
+    adapter = FakeAdapter({('GET', url): (200, deps)})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    projects = zeno.projects(page=2, size=2)
+    assert len(adapter.calls) == 1
+    assert projects[0] == {'title': 'a', 'id': 11, 'status': 'published', 'latest': '12',
+                           'concept_id': '10', 'bucket': 'https://zenodo.org/api/files/b1'}
+    assert projects[1]['status'] == 'unpublished'
+    assert projects[1]['latest'] == 'None'
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_depositions(prefetch):
+    url = 'https://zenodo.org/api/deposit/depositions?page={}&size=2'
+    adapter = FakeAdapter({
+        ('GET', url.format(1)): (200, [{'id': 1}, {'id': 2}], {'Link': f'<{url.format(2)}>; rel="next"'}),
+        ('GET', url.format(2)): (200, [{'id': 3}, {'id': 4}], {'Link': f'<{url.format(3)}>; rel="next"'}),
+        ('GET', url.format(3)): (200, [{'id': 5}], {'Link': f'<{url.format(3)}>; rel="self"'}),
+    })
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    deps = zeno.iter_depositions(page_size=2, prefetch=prefetch)
+    assert [d['id'] for d in deps] == [1, 2, 3, 4, 5]
+    assert len(adapter.calls) == 3
+    # stopping early does not request the remaining pages
+    adapter.calls.clear()
+    first = next(iter(zeno.iter_depositions(page_size=2)))
+    assert first['id'] == 1
+    assert adapter.calls == [('GET', url.format(1))]
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_depositions_capped_page_size(prefetch):
+    # the server returns fewer depositions than asked and no Link header
+    url = 'https://zenodo.org/api/deposit/depositions?page={}&size=100'
+    adapter = FakeAdapter({
+        ('GET', url.format(1)): (200, [{'id': 1}, {'id': 2}]),
+        ('GET', url.format(2)): (200, [{'id': 3}]),
+        ('GET', url.format(3)): (200, []),
+    })
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    deps = zeno.iter_depositions(prefetch=prefetch)
+    assert [d['id'] for d in deps] == [1, 2, 3]
+    assert len(adapter.calls) == 3
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_records(prefetch):
+    url = 'https://zenodo.org/api/records?page={}&size=100&q=climate'
+    adapter = FakeAdapter({
+        # the server caps the page size at 2
+        ('GET', url.format(1)): (200, {'hits': {'hits': [{'id': 1}, {'id': 2}], 'total': 5},
+                                       'links': {'next': url.format(2)}}),
+        ('GET', url.format(2)): (200, {'hits': {'hits': [{'id': 3}, {'id': 4}], 'total': 5},
+                                       'links': {'next': url.format(3)}}),
+        ('GET', url.format(3)): (200, {'hits': {'hits': [{'id': 5}], 'total': 5}, 'links': {}}),
+    })
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    records = zeno.iter_records(query='climate', prefetch=prefetch)
+    assert [r['id'] for r in records] == [1, 2, 3, 4, 5]
+    assert len(adapter.calls) == 3
+
+    # without links, hits.total tells when the last record was read
+    for page in (1, 2, 3):
+        del adapter.routes[('GET', url.format(page))][1]['links']
+    adapter.calls.clear()
+    assert [r['id'] for r in zeno.iter_records(query='climate')] == [1, 2, 3, 4, 5]
+    assert len(adapter.calls) == 3
+
+
+def test_iter_records_auth():
+    url = 'https://zenodo.org/api/records?page=1&size=100'
+    seen = []
+
+    def records(request):
+        seen.append(request.headers.get('authorization'))
+        return 200, {'hits': {'hits': [], 'total': 0}, 'links': {}}
+
+    adapter = FakeAdapter({('GET', url): records})
+    list(zen.Client(token='fake', retry=NO_WAIT, adapter=adapter).iter_records())
+    list(zen.Client(token='', retry=NO_WAIT, adapter=adapter).iter_records())
+    assert seen == ['Bearer fake', None]
+
+
+def test_download_file_streams(tmp_path):
+    bucket = 'https://zenodo.org/api/files/b1'
+    data = os.urandom(10_000)
+    adapter = FakeAdapter({('GET', f'{bucket}/data.bin'): (200, data)})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter)
+    seen = []
+    zeno.download_file('data.bin', dst_path=str(tmp_path), chunk_size=4096,
+                       progress=lambda done, total: seen.append((done, total)))
+    assert (tmp_path / 'data.bin').read_bytes() == data
+    assert not (tmp_path / 'data.bin.part').exists()
+    assert seen == [(4096, 10_000), (8192, 10_000), (10_000, 10_000)]
+
+
+def test_download_file_resumes(tmp_path):
+    bucket = 'https://zenodo.org/api/files/b1'
+    data = os.urandom(10_000)
+    ranges = []
+
+    def serve(request):
+        if len(ranges) == 0:
+            ranges.append(None)
+            raise requests.ConnectionError('connection dropped')
+        ranges.append(request.headers.get('Range'))
+        start = int(request.headers['Range'][6:-1])
+        return 206, data[start:], {'Content-Range': f'bytes {start}-{len(data) - 1}/{len(data)}'}
+
+    deposition = {'id': 5, 'files': [{'filename': 'data.bin', 'filesize': len(data),
+                                      'checksum': hashlib.md5(data).hexdigest()}]}
+    adapter = FakeAdapter({
+        ('GET', 'https://zenodo.org/api/deposit/depositions/5'): (200, deposition),
+        ('GET', f'{bucket}/data.bin'): serve,
+    })
+    (tmp_path / 'data.bin.part').write_bytes(data[:3000])
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, deposition_id=5, adapter=adapter)
+    zeno.download_file('data.bin', dst_path=str(tmp_path))
+    assert ranges == [None, 'bytes=3000-']
+    assert (tmp_path / 'data.bin').read_bytes() == data
+
+    # a corrupt partial file is detected and discarded
+    (tmp_path / 'data.bin').unlink()
+    (tmp_path / 'data.bin.part').write_bytes(b'x' * 3000)
+    with pytest.raises(IOError):
+        zeno.download_file('data.bin', dst_path=str(tmp_path))
+    assert not (tmp_path / 'data.bin.part').exists()
+
+
+def test_download_file_resume_checks_range(tmp_path):
+    bucket = 'https://zenodo.org/api/files/b1'
+    data = os.urandom(10_240)
+    ranges = []
+
+    def serve(request):
+        # ignores the requested start
+        ranges.append(request.headers.get('Range'))
+        if request.headers.get('Range'):
+            return 206, data, {'Content-Range': f'bytes 0-{len(data) - 1}/{len(data)}'}
+        return 200, data
+
+    adapter = FakeAdapter({('GET', f'{bucket}/data.bin'): serve})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter)
+    (tmp_path / 'data.bin.part').write_bytes(data[:3000])
+    zeno._download_url(f'{bucket}/data.bin', str(tmp_path / 'data.bin'), size=len(data))
+    assert ranges == ['bytes=3000-', None]
+    assert (tmp_path / 'data.bin').read_bytes() == data
+
+    # without a size or checksum a stale partial file is not resumed
+    ranges.clear()
+    (tmp_path / 'data.bin.part').write_bytes(b'stale' * 600)
+    zeno.download_file('data.bin', dst_path=str(tmp_path))
+    assert ranges == [None]
+    assert (tmp_path / 'data.bin').read_bytes() == data
+
+
+def test_download_all(tmp_path):
+    files = {f'f{i}.txt': os.urandom(1000 + i) for i in range(5)}
+    base = 'https://zenodo.org/api/records/42'
+    record = {'files': [{'key': name, 'size': len(data), 'checksum': f'md5:{hashlib.md5(data).hexdigest()}',
+                         'links': {'self': f'{base}/files/{name}/content'}}
+                        for name, data in files.items()]}
+    routes = {('GET', base): (200, record)}
+    routes.update({('GET', f'{base}/files/{name}/content'): (200, data) for name, data in files.items()})
+    routes[('GET', f'{base}/files/f4.txt/content')] = (200, b'corrupt')
+    adapter = FakeAdapter(routes)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+
+    seen = []
+    report = zeno.download_all('10.5281/zenodo.42', dst_path=str(tmp_path / 'mirror'), max_workers=3,
+                               retries=1, progress=lambda done, total: seen.append((done, total)))
+    for name, data in list(files.items())[:4]:
+        assert (tmp_path / 'mirror' / name).read_bytes() == data
+    assert not (tmp_path / 'mirror' / 'f4.txt').exists()
+    assert report['failed'] == 1
+    assert report['bytes'] == sum(len(d) for d in list(files.values())[:4])
+    assert seen[-1][1] == sum(len(d) for d in files.values())
+    # a corrupted file is fetched again, a missing one is not
+    assert adapter.calls.count(('GET', f'{base}/files/f4.txt/content')) == 2
+    del routes[('GET', f'{base}/files/f0.txt/content')]
+    adapter.calls.clear()
+    report = zeno.download_all('10.5281/zenodo.42', dst_path=str(tmp_path / 'again'), retries=3)
+    assert [f['filename'] for f in report['files'] if f['error'] is not None] == ['f0.txt', 'f4.txt']
+    assert adapter.calls.count(('GET', f'{base}/files/f0.txt/content')) == 1
+
+
+def test_download_all_rejects_unsafe_names(tmp_path):
+    base = 'https://zenodo.org/api/records/42'
+    names = ['../escaped.txt', '/tmp/absolute.txt', 'sub/nested.txt', '..', 'safe.txt']
+    record = {'files': [{'key': name, 'size': 4, 'checksum': f"md5:{hashlib.md5(b'data').hexdigest()}",
+                         'links': {'self': f'{base}/files/{i}/content'}} for i, name in enumerate(names)]}
+    routes = {('GET', base): (200, record)}
+    routes.update({('GET', f'{base}/files/{i}/content'): (200, b'data') for i in range(len(names))})
+    adapter = FakeAdapter(routes)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+
+    report = zeno.download_all('10.5281/zenodo.42', dst_path=str(tmp_path / 'mirror'))
+    errors = [f['filename'] for f in report['files'] if isinstance(f['error'], ValueError)]
+    assert errors == names[:4]
+    assert os.listdir(tmp_path / 'mirror') == ['safe.txt']
+    assert not (tmp_path / 'escaped.txt').exists()
+    assert adapter.calls.count(('GET', f'{base}/files/0/content')) == 0
+
+    report = zeno.verify(str(tmp_path / 'mirror'), '10.5281/zenodo.42')
+    assert [f['filename'] for f in report['files'] if isinstance(f['error'], ValueError)] == names[:4]
+    assert report['failed'] == 4
+
+
+def test_verify(tmp_path):
+    files = {f'f{i}.bin': os.urandom(5000 + i) for i in range(4)}
+    base = 'https://zenodo.org/api/records/42'
+    record = {'files': [{'key': name, 'size': len(data), 'checksum': f'md5:{hashlib.md5(data).hexdigest()}',
+                         'links': {'self': f'{base}/files/{name}/content'}}
+                        for name, data in files.items()]}
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=FakeAdapter({('GET', base): (200, record)}))
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / 'f1.bin').write_bytes(b'x' * len(files['f1.bin']))
+    (tmp_path / 'f2.bin').write_bytes(b'short')
+    (tmp_path / 'f3.bin').unlink()
+
+    report = zeno.verify(str(tmp_path), '10.5281/zenodo.42', max_workers=2)
+    errors = {f['filename']: str(f['error']) for f in report['files'] if f['error'] is not None}
+    assert sorted(errors) == ['f1.bin', 'f2.bin', 'f3.bin']
+    assert 'checksum' in errors['f1.bin'] and 'bytes' in errors['f2.bin'] and 'missing' in errors['f3.bin']
+    assert report['failed'] == 3
+
+
+def test_upload_many(tmp_path):
+    bucket = 'https://zenodo.org/api/files/b1'
+    dep_url = 'https://zenodo.org/api/deposit/depositions/5'
+    for i in range(6):
+        (tmp_path / f'f{i}.txt').write_text(f'file {i}')
+    received = {}
+    failures = []
+
+    def put(request):
+        name = request.url.rsplit('/', 1)[-1]
+        body = b''.join(request.body)
+        if name == 'f3.txt' and len(failures) < 2:
+            failures.append(name)
+            return 201, {'key': name, 'checksum': 'md5:' + '0' * 32}
+        received[name] = body
+        return 201, {'key': name}
+
+    routes = {('PUT', f'{bucket}/f{i}.txt'): put for i in range(6)}
+    routes[('GET', dep_url)] = (200, {'id': 5, 'links': {'publish': f'{dep_url}/actions/publish'}})
+    routes[('POST', f'{dep_url}/actions/publish')] = (202, {})
+    adapter = FakeAdapter(routes)
+    zeno = zen.Client(token='fake', retry=zen.RetryPolicy(retries=0), bucket=bucket, deposition_id=5, adapter=adapter)
+
+    report = zeno.upload_dir(str(tmp_path), max_workers=3, retries=1, publish=True)
+    assert report['failed'] == 1
+    assert not report['published']
+    assert ('POST', f'{dep_url}/actions/publish') not in adapter.calls
+
+    report = zeno.upload_many(sorted(tmp_path.iterdir()), retries=1, publish=True)
+    assert report['failed'] == 0
+    assert report['published']
+    assert received == {f'f{i}.txt': f'file {i}'.encode() for i in range(6)}
+
+    # failed requests are left to the retry policy: a 403 is sent once, a 503 or
+    # an unreachable server once per policy attempt
+    def unreachable(request):
+        raise requests.exceptions.ConnectionError('connection refused')
+
+    routes[('PUT', f'{bucket}/f0.txt')] = (403, {})
+    routes[('PUT', f'{bucket}/f1.txt')] = (503, {})
+    routes[('PUT', f'{bucket}/f2.txt')] = unreachable
+    adapter.calls.clear()
+    zeno = zen.Client(token='fake', retry=zen.RetryPolicy(retries=2, backoff=0), bucket=bucket, adapter=adapter)
+    report = zeno.upload_many([tmp_path / f'f{i}.txt' for i in range(3)], retries=3)
+    assert report['failed'] == 3
+    assert adapter.calls.count(('PUT', f'{bucket}/f0.txt')) == 1
+    assert adapter.calls.count(('PUT', f'{bucket}/f1.txt')) == 3
+    assert adapter.calls.count(('PUT', f'{bucket}/f2.txt')) == 3
+
+
+def test_file_body(tmp_path):
+    data = os.urandom(300 * 1024)
+    (tmp_path / 'big.bin').write_bytes(data)
+    body = zen.zenodopy.FileBody(str(tmp_path / 'big.bin'), chunk_size=64 * 1024, algorithms=('md5', 'sha256'))
+    assert len(body) == len(data)
+    for _ in range(2):
+        chunks = list(body)
+        assert [len(c) for c in chunks] == [65536] * 4 + [45056]
+        assert b''.join(chunks) == data
+    assert body.hexdigest('md5') == hashlib.md5(data).hexdigest()
+    assert body.hexdigest('sha256') == hashlib.sha256(data).hexdigest()
+    (tmp_path / 'empty').write_bytes(b'')
+    assert list(zen.zenodopy.FileBody(str(tmp_path / 'empty'))) == []
+
+
+def test_upload_verifies_checksum(tmp_path):
+    bucket = 'https://zenodo.org/api/files/b5'
+
+    def put(request, corrupt=False):
+        data = b''.join(request.body) + (b'!' if corrupt else b'')
+        return 201, {'key': 'f', 'checksum': f'md5:{hashlib.md5(data).hexdigest()}'}
+
+    adapter = FakeAdapter({('PUT', f'{bucket}/good.txt'): put,
+                           ('PUT', f'{bucket}/bad.txt'): lambda request: put(request, corrupt=True)})
+    for name in ('good.txt', 'bad.txt'):
+        (tmp_path / name).write_text('content')
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter)
+
+    r = zeno.upload_file(str(tmp_path / 'good.txt'), algorithms=('md5', 'sha256'))
+    assert r.request.body.hexdigest('sha256') == hashlib.sha256(b'content').hexdigest()
+    with pytest.raises(IOError, match='corrupted'):
+        zeno.upload_file(str(tmp_path / 'bad.txt'))
+    report = zeno.upload_many([str(tmp_path / 'good.txt'), str(tmp_path / 'bad.txt')], retries=1)
+    assert [f['filename'] for f in report['files'] if f['error'] is not None] == ['bad.txt']
+
+
+def test_progress_reporter(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(zen.zenodopy.time, 'monotonic', lambda: clock[0])
+    reports = []
+    reporter = zen.ProgressReporter(reports.append, interval=1, window=2, name='data.bin')
+    for now, done in ((0, 0), (0.5, 10), (1, 20), (3, 30), (3.1, 100), (4, 100)):
+        clock[0] = now
+        reporter(done, 100)
+    assert [(r.bytes, r.rate, r.eta, r.done) for r in reports] == [
+        (0, 0.0, None, False), (20, 20.0, 4.0, False), (30, 5.0, 14.0, False), (100, 80 / 2.1, 0.0, True)]
+    assert str(reports[1]) == 'data.bin: 0.0/0.0 MB 0.00 MB/s (avg 0.00 MB/s) ETA 0:00:04'
+    monkeypatch.undo()
+
+    stalls = []
+    with zen.ProgressReporter(stalls.append, interval=0.01, stall_timeout=0.05) as reporter:
+        reporter(10, None)
+        time.sleep(0.3)
+    assert any(r.stalled for r in stalls) and stalls[-1].done
+
+    bucket = 'https://zenodo.org/api/files/b5'
+    adapter = FakeAdapter({('PUT', f'{bucket}/data.bin'): lambda request: (201, {'size': len(b''.join(request.body))})})
+    (tmp_path / 'data.bin').write_bytes(os.urandom(100_000))
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter)
+    sent = []
+    zeno.upload_file(str(tmp_path / 'data.bin'), chunk_size=30_000, progress=lambda done, total: sent.append(done))
+    assert sent == [30_000, 60_000, 90_000, 100_000]
+
+
+def test_bandwidth_limiter(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(zen.zenodopy.time, 'monotonic', lambda: clock[0])
+    limiter = zen.BandwidthLimiter(100, quantum=10)
+    assert [limiter.reserve(10) for _ in range(3)] == [0, 0.1, 0.2]
+    clock[0] = 10
+    assert limiter.reserve(10) == 0
+    monkeypatch.undo()
+
+    # 0 means no cap for a client, it is not a valid rate for a limiter
+    assert zen.Client(token='fake', bandwidth=0)._bandwidth is None
+    with pytest.raises(ValueError):
+        zen.BandwidthLimiter(0)
+
+    # a small transfer is served in turn with a large one instead of waiting for it
+    limiter = zen.BandwidthLimiter(2_000_000, quantum=10_000)
+    finished = {}
+
+    def transfer(name, size):
+        limiter.acquire(size)
+        finished[name] = time.monotonic()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(transfer, 'large', 800_000)
+        executor.submit(transfer, 'small', 80_000)
+    assert finished['small'] - start < 0.5 * (finished['large'] - start)
+    assert finished['large'] - start >= 0.4
+
+    class Recorder(zen.BandwidthLimiter):
+        granted = []
+
+        def acquire(self, nbytes):
+            self.granted.append(nbytes)
+
+    bucket = 'https://zenodo.org/api/files/b5'
+    data = os.urandom(50_000)
+    adapter = FakeAdapter({('PUT', f'{bucket}/data.bin'): lambda request: (201, {'size': len(b''.join(request.body))}),
+                           ('GET', f'{bucket}/data.bin'): (200, data)})
+    (tmp_path / 'up').mkdir()
+    (tmp_path / 'up' / 'data.bin').write_bytes(data)
+    recorder = Recorder(1)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter, bandwidth=recorder)
+    zeno.upload_file(str(tmp_path / 'up' / 'data.bin'))
+    zeno.download_file('data.bin', str(tmp_path))
+    assert sum(recorder.granted) == 2 * len(data)
+
+
+def test_upload_archive_stream(tmp_path, monkeypatch):
+    bucket = 'https://zenodo.org/api/files/b1'
+    source = tmp_path / 'data'
+    (source / 'sub').mkdir(parents=True)
+    for i in range(10):
+        (source / 'sub' / f'f{i}.bin').write_bytes(os.urandom(5000 * i))
+    received = {}
+
+    def put(request):
+        received[request.url.rsplit('/', 1)[-1]] = (request.headers, b''.join(request.body))
+        return 201, {}
+
+    adapter = FakeAdapter({('PUT', f'{bucket}/data.zip'): put, ('PUT', f'{bucket}/data.tar.gz'): put})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter)
+    monkeypatch.chdir(tmp_path)
+    zeno.upload_zip(str(source), stream=True, store=True)
+    zeno.upload_tar(str(source), stream=True)
+    assert not (tmp_path / 'data.zip').exists()
+
+    headers, body = received['data.zip']
+    assert int(headers['Content-Length']) == len(body)
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        assert len(z.namelist()) == 10
+
+    headers, body = received['data.tar.gz']
+    assert headers['Transfer-Encoding'] == 'chunked'
+    with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+        assert len(tar.getnames()) == 12
+
+    # compresslevel=0 is honoured by the parallel writer
+    (source / 'text.txt').write_bytes(b'zenodo ' * 10_000)
+    zeno.upload_zip(str(source), stream=True, compresslevel=0, workers=2)
+    _, body = received['data.zip']
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.getinfo('data/text.txt').compress_size >= 70_000
+
+
+def test_parallel_archives(tmp_path):
+    source = tmp_path / 'data'
+    (source / 'sub').mkdir(parents=True)
+    for i in range(20):
+        (source / 'sub' / f'f{i}.txt').write_bytes(b'zenodo ' * 1000 * i)
+    (source / 'big.bin').write_bytes(b'abc' * 500_000 + os.urandom(500_000))
+    (source / 'image.png').write_bytes(os.urandom(300_000))
+
+    body = b''.join(zen.zenodopy.iter_parallel_zipfile(str(source), workers=4, block_size=64 * 1024))
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        assert len(z.namelist()) == 22
+        assert z.getinfo('data/image.png').compress_type == zipfile.ZIP_STORED
+        assert z.read('data/big.bin') == (source / 'big.bin').read_bytes()
+
+    blocks = [os.urandom(10) * 10_000 for _ in range(5)]
+    assert gzip.decompress(b''.join(zen.zenodopy.iter_gzip(blocks, compresslevel=6, workers=4))) == b''.join(blocks)
+
+    zen.zenodopy.make_tarfile(str(tmp_path / 'data.tar.gz'), str(source), workers=4)
+    with tarfile.open(tmp_path / 'data.tar.gz') as tar:
+        assert len(tar.getnames()) == 24
+
+
+def test_retry():
+    url = 'https://zenodo.org/api/deposit/depositions/5'
+    statuses = [503, 429, 200]
+    adapter = FakeAdapter({('GET', url): lambda request: (statuses.pop(0), {'id': 5})})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, deposition_id=5, adapter=adapter)
+    assert zeno._get_depositions_by_id() == {'id': 5}
+    assert len(adapter.calls) == 3
+
+    # a body that can only be read once is not replayed
+    adapter = FakeAdapter({('PUT', url): (503, {})})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    assert zeno._request('PUT', url, data=iter([b'x'])).status_code == 503
+    assert len(adapter.calls) == 1
+
+    policy = zen.RetryPolicy(backoff=1, max_backoff=10)
+    assert 0 <= policy.delay(3) <= 8
+    assert policy.delay(0, {'Retry-After': '7'}) == 7
+    assert policy.should_retry(4, 503)
+    assert not policy.should_retry(4, 404)
+    assert not policy.should_retry(5, 503)
+    assert policy.should_retry(0, 503, 'PUT')
+    assert not policy.should_retry(0, 503, 'POST')
+    assert policy.should_retry(0, 429, 'POST')
+    assert not policy.should_retry(0, method='POST')
+    assert policy.should_retry(0, method='POST', sent=False)
+
+    # a POST the server may have acted on is not sent again
+    adapter = FakeAdapter({('POST', url): (502, {})})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter)
+    assert zeno._request('POST', url).status_code == 502
+    assert len(adapter.calls) == 1
+
+
+def test_request_hooks():
+    api = 'https://zenodo.org/api'
+    bucket = f'{api}/files/b5'
+    statuses = [503, 200]
+    adapter = FakeAdapter({
+        ('GET', f'{api}/deposit/depositions/5'): lambda request: (statuses.pop(0), {'id': 5}),
+        ('PUT', f'{bucket}/data.zip'): lambda request: (201, {'size': len(b''.join(request.body))}),
+    })
+
+    class Tracer:
+        spans = []
+
+        def start_span(self, name, start_time, attributes):
+            span = types.SimpleNamespace(name=name, attributes=dict(attributes), start=start_time)
+            span.set_attribute = span.attributes.__setitem__
+            span.record_exception = lambda e: None
+            span.end = lambda end_time: self.spans.append((span, end_time))
+            return span
+
+    events, stats, tracer = [], zen.RequestStats(), Tracer()
+    zeno = zen.Client(token='fake', retry=NO_WAIT, bucket=bucket, adapter=adapter,
+                      hooks=[events.append, stats, zen.SpanHook(tracer)])
+    zeno._get_deposition(5)
+    zeno._put_stream('data.zip', iter([b'abc', b'defg']))
+    with pytest.raises(requests.exceptions.HTTPError):
+        zeno._get_deposition(6)
+
+    assert [(e.method, e.endpoint, e.status, e.retries) for e in events] == [
+        ('GET', '/api/deposit/depositions/{id}', 200, 1),
+        ('PUT', '/api/files/{bucket}/{key}', 201, 0),
+        ('GET', '/api/deposit/depositions/{id}', 404, 0)]
+    assert events[1].bytes_sent == 7
+    snapshot = stats.snapshot()
+    assert snapshot['GET /api/deposit/depositions/{id}']['count'] == 2
+    assert snapshot['GET /api/deposit/depositions/{id}']['errors'] == 1
+    assert snapshot['GET /api/deposit/depositions/{id}']['retries'] == 1
+    assert sum(snapshot['PUT /api/files/{bucket}/{key}']['histogram']) == 1
+    span, end = tracer.spans[1]
+    assert span.name == 'PUT /api/files/{bucket}/{key}' and end >= span.start
+    assert span.attributes['http.response.status_code'] == 201
+    assert tracer.spans[2][0].attributes['error.type'] == '404'
+    assert zen.zenodopy.endpoint_template(f'{api}/records/42/files/a.nc/content') == '/api/records/{id}/files/{key}/content'
+    assert zen.zenodopy.endpoint_template(f'{api}/deposit/depositions/4/actions/publish') == \
+        '/api/deposit/depositions/{id}/actions/publish'
+
+
+def test_rate_limiter(monkeypatch):
+    waits = []
+    monkeypatch.setattr(zen.zenodopy.time, 'sleep', waits.append)
+    limiter = zen.RateLimiter(rate=10, capacity=2)
+    for _ in range(4):
+        limiter.acquire()
+    assert len(waits) == 2
+    assert all(0 < w <= 0.2 for w in waits)
+
+
+def test_update_polls_new_draft(tmp_path, monkeypatch):
+    api = 'https://zenodo.org/api/deposit/depositions'
+    bucket = 'https://zenodo.org/api/files/b6'
+    drafts = [(404, {}), (200, {'id': 6, 'links': {}}),
+              (200, {'id': 6, 'title': 'draft', 'links': {'bucket': bucket}})]
+    adapter = FakeAdapter({
+        ('GET', f'{api}/5'): (200, {'id': 5, 'links': {'newversion': f'{api}/5/actions/newversion'}}),
+        ('POST', f'{api}/5/actions/newversion'): (201, {'links': {'latest_draft': f'{api}/6'}}),
+        ('GET', f'{api}/6'): lambda request: drafts.pop(0) if len(drafts) > 1 else drafts[0],
+        ('PUT', f'{api}/6'): (200, {}),
+        ('PUT', f'{bucket}/data.txt'): (201, {}),
+    })
+    waits = []
+    monkeypatch.setattr(zen.zenodopy.time, 'sleep', waits.append)
+    (tmp_path / 'data.txt').write_text('data')
+    zeno = zen.Client(token='fake', retry=NO_WAIT, deposition_id=5, adapter=adapter)
+    zeno.update(zen.ZenodoMetadata(title='draft'), source=str(tmp_path / 'data.txt'))
+    assert (zeno.deposition_id, zeno.bucket, zeno.title) == (6, bucket, 'draft')
+    assert waits == [0.1, 0.2]
+    assert adapter.calls[-1] == ('PUT', f'{bucket}/data.txt')
+
+
+def test_update_many(tmp_path):
+    api = 'https://zenodo.org/api/deposit/depositions'
+    routes = {('GET', f'{api}/9'): (200, {'id': 9, 'links': {'newversion': f'{api}/9/actions/newversion'}}),
+              ('POST', f'{api}/9/actions/newversion'): (500, {})}
+    for old, new in ((5, 6), (7, 8)):
+        bucket = f'https://zenodo.org/api/files/b{new}'
+        routes.update({
+            ('GET', f'{api}/{old}'): (200, {'id': old, 'links': {'newversion': f'{api}/{old}/actions/newversion'}}),
+            ('POST', f'{api}/{old}/actions/newversion'): (201, {'links': {'latest_draft': f'{api}/{new}'}}),
+            ('GET', f'{api}/{new}'): (200, {'id': new, 'title': 'draft', 'links': {
+                'bucket': bucket, 'publish': f'{api}/{new}/actions/publish'}}),
+            ('PUT', f'{api}/{new}'): (200, {}),
+            ('PUT', f'{bucket}/data.txt'): (201, {}),
+            ('POST', f'{api}/{new}/actions/publish'): (202, {}),
+        })
+    adapter = FakeAdapter(routes)
+    (tmp_path / 'data.txt').write_text('data')
+    zeno = zen.Client(token='fake', retry=zen.RetryPolicy(retries=0), adapter=adapter)
+
+    source = str(tmp_path / 'data.txt')
+    report = zeno.update_many([(5, zen.ZenodoMetadata(title='a'), source),
+                               {'deposition_id': 9, 'metadata': zen.ZenodoMetadata(title='b'), 'source': source},
+                               (7, zen.ZenodoMetadata(title='c'), source)], publish=True)
+    assert report['failed'] == 1
+    assert [(job['deposition_id'], job['new_deposition_id'], job['stage'], job['published'])
+            for job in report['jobs']] == [(5, 6, 'done', True), (9, None, 'newversion', False), (7, 8, 'done', True)]
+    assert isinstance(report['jobs'][1]['error'], requests.exceptions.HTTPError)
+    assert zeno.deposition_id is None
+    assert ('POST', f'{api}/8/actions/publish') in adapter.calls
+
+
+def test_update_many_archives(tmp_path, monkeypatch):
+    api = 'https://zenodo.org/api/deposit/depositions'
+    uploads = {}
+    routes = {}
+    both_uploading = threading.Barrier(2, timeout=2)
+
+    def put(request):
+        uploads[request.url] = b''.join(request.body)
+        try:
+            both_uploading.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return 201, {}
+
+    for old, new in ((5, 6), (7, 8)):
+        bucket = f'https://zenodo.org/api/files/b{new}'
+        routes.update({
+            ('GET', f'{api}/{old}'): (200, {'id': old, 'links': {'newversion': f'{api}/{old}/actions/newversion'}}),
+            ('POST', f'{api}/{old}/actions/newversion'): (201, {'links': {'latest_draft': f'{api}/{new}'}}),
+            ('GET', f'{api}/{new}'): (200, {'id': new, 'links': {'bucket': bucket}}),
+            ('PUT', f'{api}/{new}'): (200, {}),
+            ('PUT', f'{bucket}/build.zip'): put,
+        })
+    for job in ('job1', 'job2'):
+        (tmp_path / job / 'build').mkdir(parents=True)
+        (tmp_path / job / 'build' / f'{job}.txt').write_text(job)
+    monkeypatch.chdir(tmp_path)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=FakeAdapter(routes))
+
+    # both sources are archived as build.zip at the same time, each job in its own directory
+    report = zeno.update_many([(5, zen.ZenodoMetadata(title='a'), str(tmp_path / 'job1' / 'build')),
+                               (7, zen.ZenodoMetadata(title='b'), str(tmp_path / 'job2' / 'build'))], max_workers=2)
+    assert report['failed'] == 0
+    for new, job in ((6, 'job1'), (8, 'job2')):
+        with zipfile.ZipFile(io.BytesIO(uploads[f'https://zenodo.org/api/files/b{new}/build.zip'])) as z:
+            assert z.namelist() == [f'build/{job}.txt']
+    assert not (tmp_path / 'build.zip').exists()
+
+
+def test_deposition_cache():
+    url = 'https://zenodo.org/api/deposit/depositions/5'
+    bucket = 'https://zenodo.org/api/files/b5'
+    deposition = {'id': 5, 'links': {'bucket': bucket}, 'files': []}
+
+    def get(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return 304, b''
+        return 200, deposition
+
+    adapter = FakeAdapter({('GET', url): get, ('DELETE', f'{bucket}/a.txt'): (204, b'')})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, deposition_id=5, bucket=bucket, adapter=adapter)
+    zeno._get_depositions_by_id()
+    zeno._get_bucket_by_id()
+    zeno._get_latest_record()
+    assert len(adapter.calls) == 1
+
+    # writes invalidate the cached deposition
+    zeno.delete_file('a.txt')
+    zeno._get_depositions_by_id()
+    assert adapter.calls[-1] == ('GET', url)
+    assert len(adapter.calls) == 3
+
+    # expired entries are revalidated with their ETag
+    zeno._deposition_cache['5']['etag'] = '"v1"'
+    assert zeno._get_deposition(5, refresh=True) == deposition
+    zeno._cache_ttl = 0
+    assert zeno._get_deposition(5) == deposition
+    assert len(adapter.calls) == 5
+
+
+def test_record_cache(tmp_path):
+    url = 'https://zenodo.org/api/records/{}'
+    routes = {('GET', url.format(i)): (200, {'id': i, 'files': [], 'pad': 'x' * 400}) for i in range(4)}
+    adapter = FakeAdapter(routes)
+    cache = zen.RecordCache(cache_dir=str(tmp_path), max_bytes=1500)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter, record_cache=cache)
+    for i in range(3):
+        zeno.get_urls_from_doi(f'10.5281/zenodo.{i}')
+    zeno.get_urls_from_doi('10.5281/zenodo.0')
+    assert len(adapter.calls) == 3
+
+    # another client (or process) shares the cache, the least recently used record was evicted
+    zeno.get_urls_from_doi('10.5281/zenodo.3')
+    offline = zen.Client(token='fake', adapter=FakeAdapter(),
+                         record_cache=zen.RecordCache(cache_dir=str(tmp_path), offline=True))
+    assert offline._get_record('0')['id'] == 0
+    with pytest.raises(LookupError):
+        offline._get_record('1')
+    # sandbox records with the same ids are not served from the production ones
+    with pytest.raises(LookupError):
+        zen.Client(token='fake', sandbox=True, adapter=FakeAdapter(),
+                   record_cache=zen.RecordCache(cache_dir=str(tmp_path), offline=True))._get_record('0')
+
+
+def test_record_cache_concept_id(tmp_path):
+    # a concept id resolves to the latest version, it is never cached itself
+    url = 'https://zenodo.org/api/records/{}'
+    adapter = FakeAdapter({('GET', url.format(10)): (200, {'id': 12, 'files': []})})
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter,
+                      record_cache=zen.RecordCache(cache_dir=str(tmp_path)))
+    zeno.get_urls_from_doi('10.5281/zenodo.10')
+    zeno.get_urls_from_doi('10.5281/zenodo.10')
+    assert adapter.calls == [('GET', url.format(10))] * 2
+    # the version it resolved to is
+    zeno.get_urls_from_doi('10.5281/zenodo.12')
+    assert len(adapter.calls) == 2
+
+
+def test_file_cache(tmp_path):
+    data = os.urandom(5000)
+    checksum = f'md5:{hashlib.md5(data).hexdigest()}'
+    base = 'https://zenodo.org/api/records/{}'
+    routes = {}
+    for record in (1, 2):
+        files = [{'key': f'copy{i}.bin', 'size': len(data), 'checksum': checksum,
+                  'links': {'self': f'{base.format(record)}/files/copy{i}.bin/content'}} for i in range(3)]
+        routes[('GET', base.format(record))] = (200, {'files': files})
+        routes.update({('GET', f['links']['self']): (200, data) for f in files})
+    adapter = FakeAdapter(routes)
+    cache = zen.FileCache(cache_dir=str(tmp_path / 'cache'), max_bytes=10_000)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, adapter=adapter, file_cache=cache)
+
+    zeno.download_all('10.5281/zenodo.1', dst_path=str(tmp_path / 'v1'), max_workers=3)
+    zeno.download_all('10.5281/zenodo.2', dst_path=str(tmp_path / 'v2'), max_workers=3)
+    assert len([url for _, url in adapter.calls if url.endswith('/content')]) == 1
+    for version in ('v1', 'v2'):
+        for i in range(3):
+            assert (tmp_path / version / f'copy{i}.bin').read_bytes() == data
+    # the downloaded file was copied into the cache, only the ones linked from it are read-only
+    modes = [os.stat(tmp_path / version / f'copy{i}.bin').st_mode for version in ('v1', 'v2') for i in range(3)]
+    assert sorted(bool(mode & stat.S_IWUSR) for mode in modes) == [False] * 5 + [True]
+
+    # least recently used files are evicted beyond max_bytes, files still being written are left alone
+    in_flight = cache.path(checksum) + '.1.2.tmp'
+    with open(in_flight, 'wb') as f:
+        f.write(os.urandom(20_000))
+    for i in range(3):
+        other = os.urandom(4000)
+        (tmp_path / 'other').write_bytes(other)
+        cache.store(f'md5:{hashlib.md5(other).hexdigest()}', str(tmp_path / 'other'))
+        (tmp_path / 'other').unlink()
+    assert not os.path.exists(cache.path(checksum))
+    assert os.path.exists(in_flight)
+    # files that were linked to an evicted one can be written again
+    assert all(os.stat(tmp_path / 'v2' / f'copy{i}.bin').st_mode & stat.S_IWUSR for i in range(3))
+
+    # unrelated files are fetched concurrently, even when their digests share a prefix
+    acquired = threading.Event()
+
+    def fetch_other():
+        with cache.lock('md5:ab' + '1' * 30):
+            acquired.set()
+
+    with cache.lock('md5:ab' + '0' * 30):
+        threading.Thread(target=fetch_other, daemon=True).start()
+        assert acquired.wait(timeout=5)
+
+
+def test_sync(tmp_path):
+    url = 'https://zenodo.org/api/deposit/depositions/5'
+    bucket = 'https://zenodo.org/api/files/b5'
+    for name in ('a.txt', 'b.txt', 'd.txt'):
+        (tmp_path / name).write_text(name)
+    files = [{'id': '1', 'filename': 'a.txt', 'checksum': hashlib.md5(b'a.txt').hexdigest()},
+             {'id': '2', 'filename': 'b.txt', 'checksum': hashlib.md5(b'old').hexdigest()},
+             {'id': '3', 'filename': 'c.txt', 'checksum': hashlib.md5(b'c.txt').hexdigest()}]
+    routes = {('GET', url): (200, {'id': 5, 'files': files})}
+    routes.update({(method, f'{bucket}/{name}'): (201, {})
+                   for method in ('PUT', 'DELETE') for name in ('a.txt', 'b.txt', 'c.txt', 'd.txt')})
+    adapter = FakeAdapter(routes)
+    zeno = zen.Client(token='fake', retry=NO_WAIT, deposition_id=5, bucket=bucket, adapter=adapter)
+
+    report = zeno.upload_dir(str(tmp_path), mode='sync')
+    assert report['skipped'] == ['a.txt']
+    assert report['deleted'] == ['c.txt']
+    assert sorted(f['filename'] for f in report['files']) == ['b.txt', 'd.txt']
+    assert sorted(call for call in adapter.calls if call[0] != 'GET') == [
+        ('DELETE', f'{bucket}/c.txt'), ('PUT', f'{bucket}/b.txt'), ('PUT', f'{bucket}/d.txt')]
+
+    # a file that could not be deleted is a failure, and the project is not published
+    routes[('DELETE', f'{bucket}/c.txt')] = (403, {})
+    report = zeno.sync(str(tmp_path), publish=True)
+    assert report['deleted'] == []
+    assert report['failed'] == 1
+    assert [f['filename'] for f in report['files'] if f['error'] is not None] == ['c.txt']
+    assert not report['published']
+
+    # files with the same name are refused before anything is deleted, even if one of them is unchanged
+    adapter.calls.clear()
+    for sub in ('x', 'y'):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / 'a.txt').write_text('a.txt')
+    with pytest.raises(ValueError):
+        zeno.sync(str(tmp_path))
+    with pytest.raises(ValueError):
+        zeno.sync([str(tmp_path / 'x' / 'a.txt'), str(tmp_path / 'y' / 'a.txt')])
+    assert adapter.calls == []
+
+
+def test_async_client(tmp_path):
+    web = pytest.importorskip('aiohttp.web')
+    import asyncio
+    payload = b'async payload' * 1000
+    uploads = {}
+
+    async def depositions(request):
+        return web.json_response([{'id': 7, 'title': 'async', 'state': 'unsubmitted', 'submitted': False,
+                                   'links': {'bucket': str(request.url.with_path('/files/b7'))}}])
+
+    async def deposition(request):
+        return web.json_response({'id': 7, 'files': [
+            {'filename': 'data.bin', 'filesize': len(payload), 'checksum': hashlib.md5(payload).hexdigest()}]})
+
+    async def put_file(request):
+        uploads[request.match_info['name']] = await request.read()
+        return web.json_response({}, status=201)
+
+    async def get_file(request):
+        return web.Response(body=payload)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/deposit/depositions', depositions)
+        app.router.add_get('/deposit/depositions/7', deposition)
+        app.router.add_put('/files/b7/{name}', put_file)
+        app.router.add_get('/files/b7/{name}', get_file)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with zen.AsyncClient(token='fake', retry=NO_WAIT) as zeno:
+                zeno._endpoint = f'http://127.0.0.1:{port}'
+                assert [p['id'] for p in await zeno.projects()] == [7]
+                await zeno.set_project(7)
+                assert zeno.bucket.endswith('/files/b7')
+                (tmp_path / 'up.txt').write_bytes(b'hello')
+                await zeno.upload_file(str(tmp_path / 'up.txt'))
+                await zeno.download_file('data.bin', str(tmp_path))
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    assert uploads == {'up.txt': b'hello'}
+    assert (tmp_path / 'data.bin').read_bytes() == payload
+
+
+def test_async_iter_depositions_prefetch():
+    web = pytest.importorskip('aiohttp.web')
+    import asyncio
+    deps = [{'id': i, 'title': f'project {i}'} for i in range(250)]
+
+    async def depositions(request):
+        # the next page arrives after the current one is consumed
+        await asyncio.sleep(0.05)
+        # the page size is capped below the requested 100, and there is no Link header
+        page = int(request.query['page'])
+        return web.json_response(deps[(page - 1) * 30:page * 30])
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/deposit/depositions', depositions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with zen.AsyncClient(token='fake', retry=NO_WAIT) as zeno:
+                zeno._endpoint = f'http://127.0.0.1:{port}'
+                ids = [dep['id'] async for dep in zeno.iter_depositions(prefetch=True)]
+                # stopping early cancels the prefetched page
+                early = zeno.iter_depositions(prefetch=True)
+                assert (await early.__anext__())['id'] == 0
+                await early.aclose()
+        finally:
+            await runner.cleanup()
+        return ids
+
+    assert asyncio.run(main()) == list(range(250))
+
+
 def test_get_baseurl():
     zeno = zen.Client(sandbox=True)
     assert zeno._endpoint == 'https://sandbox.zenodo.org/api'